@@ -0,0 +1,82 @@
+from cooldowns import Cooldown
+from templates import compile_template, compile_params
+from triggers import TriggerIndex, PatternIndex, MATCH_ALL, MATCH_LONGEST, PREFIX, compile_pattern
+
+
+class CompiledAction:
+    __slots__ = ("trigger", "order", "prefix", "pattern", "responses", "use_mod", "mod_type", "mod_params",
+                 "mod_concurrency", "mod_timeout", "mod_ordered", "cooldown")
+
+    def __init__(self, act, order=0):
+        self.trigger = act["trigger"]
+        self.order = order
+        self.prefix = self.trigger
+        self.pattern = None
+        trigger_type = act.get("trigger_type", PREFIX)
+        if trigger_type != PREFIX:
+            source, converters, self.prefix = compile_pattern(self.trigger, trigger_type)
+            self.pattern = (source, converters)
+        self.responses = [compile_template(response, self.trigger) for response in act.get("responses", [])]
+        self.use_mod = act.get("use_mod", False)
+        mod_action = act.get("mod_action") or {}
+        self.mod_type = mod_action.get("type", "query")
+        self.mod_params = compile_params(mod_action.get("params", {}), self.trigger)
+        self.mod_concurrency = mod_action.get("concurrency")
+        self.mod_timeout = mod_action.get("timeout")
+        self.mod_ordered = mod_action.get("ordered", False)
+        self.cooldown = Cooldown.from_settings(act.get("cooldown"))
+
+
+def compile_actions(actions):
+    return [CompiledAction(act, order) for order, act in enumerate(actions)]
+
+
+def _compiled_trigger(act):
+    return act.trigger
+
+
+def _compiled_pattern(act):
+    return act.pattern
+
+
+def _compiled_prefix(act):
+    return act.prefix
+
+
+def _order(entry):
+    return entry[0].order
+
+
+class ActionSet:
+    __slots__ = ("version", "mode", "actions", "index", "patterns")
+
+    def __init__(self, actions, mode=MATCH_ALL, version=0):
+        self.version = version
+        self.mode = mode
+        self.actions = compile_actions(actions)
+        self.index = TriggerIndex([act for act in self.actions if act.pattern is None], mode, key=_compiled_trigger)
+        patterned = [act for act in self.actions if act.pattern is not None]
+        self.patterns = PatternIndex(patterned, key=_compiled_pattern, prefix=_compiled_prefix) if patterned else None
+
+    @classmethod
+    def from_config(cls, cfg, version=0):
+        return cls(cfg["actions"], cfg.get("trigger_match", MATCH_ALL), version)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def match(self, comment):
+        found = [(act, None) for act in self.index.match(comment)]
+        if self.patterns is None:
+            return found
+        hit = self.patterns.match(comment)
+        if hit is None:
+            return found
+        act, args, length = hit
+        if self.mode == MATCH_LONGEST:
+            if found and len(found[0][0].trigger) >= length:
+                return found
+            return [(act, args)]
+        found.append((act, args))
+        found.sort(key=_order)
+        return found
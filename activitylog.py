@@ -0,0 +1,165 @@
+import collections
+import logging
+import logging.handlers
+import threading
+import time
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel, QTimer
+from PySide6.QtGui import QColor
+
+SOURCES = ["system", "tiktok", "twitch", "mod", "error"]
+SOURCE_LABELS = {
+    "system": "System",
+    "tiktok": "TikTok",
+    "twitch": "Twitch",
+    "mod": "DumbRequestManager",
+    "error": "Errors",
+}
+SOURCE_COLORS = {
+    "error": QColor("red"),
+    "mod": QColor("purple"),
+    "tiktok": QColor("#d6006f"),
+    "twitch": QColor("#6441a5"),
+}
+
+SourceRole = Qt.UserRole + 1
+
+DEFAULT_CAPACITY = 5000
+DEFAULT_FLUSH_INTERVAL = 200
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUPS = 3
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("Ring buffer capacity must be at least 1")
+        self.capacity = capacity
+        self.items = [None] * capacity
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0 or index >= self.count:
+            raise IndexError(index)
+        return self.items[(self.start + index) % self.capacity]
+
+    def append(self, item):
+        if self.count < self.capacity:
+            self.items[(self.start + self.count) % self.capacity] = item
+            self.count += 1
+        else:
+            self.items[self.start] = item
+            self.start = (self.start + 1) % self.capacity
+
+    def drop_front(self, n):
+        n = min(n, self.count)
+        for _ in range(n):
+            self.items[self.start] = None
+            self.start = (self.start + 1) % self.capacity
+        self.count -= n
+
+
+class ActivityLogModel(QAbstractListModel):
+    def __init__(self, capacity=DEFAULT_CAPACITY, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 log_file="", max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS, parent=None):
+        super().__init__(parent)
+        self.entries = RingBuffer(capacity)
+        self.lock = threading.Lock()
+        # lines past capacity would be trimmed at the next flush anyway, so they never pile up in memory
+        self.pending = collections.deque(maxlen=capacity)
+
+        self.file_logger = None
+        if log_file:
+            handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.file_logger = logging.getLogger("layconnector.activity")
+            self.file_logger.propagate = False
+            self.file_logger.setLevel(logging.INFO)
+            self.file_logger.handlers = [handler]
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(flush_interval)
+
+    @classmethod
+    def from_settings(cls, settings, parent=None):
+        return cls(
+            capacity=settings.get("capacity", DEFAULT_CAPACITY),
+            flush_interval=settings.get("flush_interval", DEFAULT_FLUSH_INTERVAL),
+            log_file=settings.get("file", ""),
+            max_bytes=settings.get("max_bytes", DEFAULT_MAX_BYTES),
+            backups=settings.get("backups", DEFAULT_BACKUPS),
+            parent=parent,
+        )
+
+    def append(self, source, message):
+        line = time.strftime("%H:%M:%S") + " - " + message
+        dropped = None
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                dropped = self.pending[0]
+            self.pending.append((line, source))
+        if dropped is not None and self.file_logger is not None:
+            self.file_logger.info(f"[{dropped[1]}] {dropped[0]}")
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, collections.deque(maxlen=self.pending.maxlen)
+
+        if self.file_logger is not None:
+            for line, source in batch:
+                self.file_logger.info(f"[{source}] {line}")
+
+        capacity = self.entries.capacity
+        overflow = len(self.entries) + len(batch) - capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self.entries.drop_front(overflow)
+            self.endRemoveRows()
+
+        first = len(self.entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for entry in batch:
+            self.entries.append(entry)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.entries):
+            return None
+        line, source = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            return line
+        if role == SourceRole:
+            return source
+        if role == Qt.ForegroundRole:
+            return SOURCE_COLORS.get(source)
+        return None
+
+
+class SourceFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.source_filter = None
+
+    def set_source(self, source):
+        self.source_filter = source
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        if self.source_filter is None:
+            return True
+        index = self.sourceModel().index(row, 0, parent)
+        return self.sourceModel().data(index, SourceRole) == self.source_filter
@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import sqlite3
+import sys
+import time
+
+from config import CONFIG_DIR, CONFIG_FILE, ConfigError, load_config
+
+DEFAULT_PATH = os.path.join(CONFIG_DIR, "archive.sqlite3")
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 20000
+DEFAULT_SEARCH_LIMIT = 100
+TRIGGER_SEPARATOR = "\n"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    username TEXT NOT NULL COLLATE NOCASE,
+    user_id TEXT NOT NULL COLLATE NOCASE,
+    comment TEXT NOT NULL,
+    triggers TEXT NOT NULL DEFAULT '',
+    mod_result TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_user_id_ts ON comments (user_id, ts);
+CREATE INDEX IF NOT EXISTS comments_username_ts ON comments (username, ts);
+CREATE INDEX IF NOT EXISTS comments_ts ON comments (ts);
+CREATE INDEX IF NOT EXISTS comments_fired_ts ON comments (ts) WHERE triggers != '';
+"""
+
+COLUMNS = ("ts", "source", "username", "user_id", "comment", "triggers", "mod_result")
+
+
+def connect(path, readonly=False):
+    if readonly:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+    connection.execute("PRAGMA busy_timeout=5000")
+    return connection
+
+
+def search(connection, user=None, trigger=None, text=None, source=None, since=None, until=None,
+           limit=DEFAULT_SEARCH_LIMIT):
+    clauses = []
+    params = []
+    if user:
+        clauses.append("(user_id = ? OR username = ?)")
+        params += [user.lstrip("@"), user.lstrip("@")]
+    if trigger:
+        # the comments_fired_ts partial index keeps trigger-only searches off the chatter rows
+        clauses.append("triggers != '' AND instr(? || triggers || ?, ?) > 0")
+        params += [TRIGGER_SEPARATOR, TRIGGER_SEPARATOR, f"{TRIGGER_SEPARATOR}{trigger}{TRIGGER_SEPARATOR}"]
+    if text:
+        clauses.append("comment LIKE ? ESCAPE '\\'")
+        params.append("%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if source:
+        clauses.append("source = ?")
+        params.append(source)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+
+    query = f"SELECT {', '.join(COLUMNS)} FROM comments"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY ts DESC LIMIT ?"
+    params.append(limit)
+    return [dict(zip(COLUMNS, row)) for row in connection.execute(query, params)]
+
+
+class CommentArchive:
+    def __init__(self, path=DEFAULT_PATH, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_pending=DEFAULT_MAX_PENDING, log=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.log = log
+        self.pending = []
+        self.wakeup = asyncio.Event()
+        self.connection = None
+        # sqlite connections are not shared between threads, so all writes go through one thread
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="layconnector-archive")
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @classmethod
+    def from_settings(cls, settings, log=None):
+        return cls(
+            settings.get("path", DEFAULT_PATH),
+            batch_size=settings.get("batch_size", DEFAULT_BATCH_SIZE),
+            flush_interval=settings.get("flush_interval", DEFAULT_FLUSH_INTERVAL),
+            max_pending=settings.get("max_pending", DEFAULT_MAX_PENDING),
+            log=log,
+        )
+
+    def record(self, source, username, user_id, comment, triggers=(), mod_result=None):
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append((
+            time.time(), source, username, user_id, comment, TRIGGER_SEPARATOR.join(triggers), mod_result
+        ))
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+
+    def _write(self, batch):
+        if self.connection is None:
+            self.connection = connect(self.path)
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO comments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", batch
+            )
+
+    def _close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch = self.pending
+        self.pending = []
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._write, batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            if self.log:
+                self.log(f"Failed to write {len(batch)} comments to the archive: {str(e)}")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                await self.flush()
+        finally:
+            await asyncio.shield(self.flush())
+            await loop.run_in_executor(self.executor, self._close)
+            self.executor.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            "pending": len(self.pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+def format_row(row):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["ts"]))
+    line = f"{stamp} [{row['source']}] {row['username']}: {row['comment']}"
+    if row["mod_result"]:
+        line += f"  -> {row['mod_result']}"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the LayConnector comment archive.")
+    parser.add_argument("--config", default=CONFIG_FILE, help="path to config.json")
+    parser.add_argument("--db", help="path to the archive database (default: archive.path from config.json)")
+    parser.add_argument("--user", help="TikTok unique id or nickname")
+    parser.add_argument("--trigger", help="only comments that fired this action trigger, e.g. !bsr")
+    parser.add_argument("--text", help="only comments containing this text (slow on large archives)")
+    parser.add_argument("--source", help="only comments from this TikTok stream")
+    parser.add_argument("--hours", type=float, help="only the last N hours")
+    parser.add_argument("--limit", type=int, default=DEFAULT_SEARCH_LIMIT)
+    args = parser.parse_args(argv)
+
+    path = args.db
+    if path is None:
+        try:
+            path = load_config(args.config).get("archive", {}).get("path", DEFAULT_PATH)
+        except (OSError, ConfigError):
+            path = DEFAULT_PATH
+    if not os.path.exists(path):
+        print(f"No archive at {path}", file=sys.stderr)
+        return 2
+
+    connection = connect(path, readonly=True)
+    started = time.perf_counter()
+    rows = search(
+        connection,
+        user=args.user,
+        trigger=args.trigger,
+        text=args.text,
+        source=args.source,
+        since=time.time() - args.hours * 3600 if args.hours else None,
+        limit=args.limit,
+    )
+    elapsed = time.perf_counter() - started
+    for row in reversed(rows):
+        print(format_row(row))
+    print(f"{len(rows)} comments in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    connection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
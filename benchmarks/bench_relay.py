@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from connector import Connector
+from metrics import Histogram
+from fake_servers import (
+    FakeTwitch, IrcChannel, FakeDumbRequestManager,
+    MOD_HTTP_PORT, MOD_WS_PORT, TWITCH_IRC_PORT,
+)
+
+CHANNEL = "bench"
+SOURCE = "bench"
+SEQUENCE = re.compile(r"\[#(\d+)\]")
+CHATTER = [
+    "hello chat", "this map is insane", "lets gooo", "first time here, love the stream",
+    "how are you so good at this", "W", "what song is this?", "can you play something harder",
+]
+
+
+def bench_config(args):
+    return {
+        "tiktok_username": SOURCE,
+        "twitch_username": CHANNEL,
+        "twitch_token": "oauth:bench",
+        "trigger_match": "all",
+        "actions": [
+            {"trigger": "!hi", "responses": ["Hello {username}! [{counter}]"]},
+            {"trigger": "!bsr", "responses": [], "use_mod": True,
+             "mod_action": {"type": "addKey", "params": {"map_key": "{arg1}"}}},
+            {"trigger": "!queue", "responses": [], "use_mod": True, "mod_action": {"type": "queue", "params": {}}},
+            {"trigger": "!where", "responses": [], "use_mod": True, "mod_action": {"type": "where", "params": {}}},
+        ],
+        "mod_enabled": not args.no_mod,
+        "mod_settings": {
+            "http_url": f"http://127.0.0.1:{args.mod_http_port}",
+            "websocket_url": f"ws://127.0.0.1:{args.mod_ws_port}",
+        },
+        "outbound": {"rate_limit": [args.twitch_rate, 1], "mirror_queue_size": args.queue_size,
+                     "response_queue_size": args.queue_size},
+        "pipeline": {"ingest": {"queue_size": args.queue_size}},
+    }
+
+
+def synthetic_comments(args):
+    rng = random.Random(args.seed)
+    users = [f"viewer{n}" for n in range(args.users)]
+    for _ in range(args.count):
+        user = rng.choice(users)
+        roll = rng.random()
+        if roll < args.mod_ratio:
+            comment = f"!bsr {rng.randrange(0x1000, 0xfffff):x}"
+        elif roll < args.mod_ratio * 2:
+            comment = rng.choice(("!queue", "!where"))
+        elif roll < args.mod_ratio * 2 + args.trigger_ratio:
+            comment = "!hi"
+        else:
+            comment = rng.choice(CHATTER)
+        yield None, user, comment
+
+
+def recorded_comments(path, speed):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            offset = entry.get("offset")
+            yield (offset / speed if offset is not None else None), entry.get("nickname") or entry["unique_id"], entry["comment"]
+
+
+def make_event(seq, user, comment):
+    # the sequence tag rides along in the mirrored text so the fake Twitch server can time each comment
+    return SimpleNamespace(
+        user=SimpleNamespace(nickname=user, unique_id=user),
+        comment=f"{comment} [#{seq}]",
+    )
+
+
+def rss_megabytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+async def feed(submit, comments, rate, submitted):
+    started = time.perf_counter()
+    for seq, (offset, user, comment) in enumerate(comments):
+        if offset is not None:
+            due = started + offset
+        else:
+            due = started + seq / rate
+        delay = due - time.perf_counter()
+        if delay > 0.001:
+            await asyncio.sleep(delay)
+        submitted[seq] = time.perf_counter()
+        await submit(make_event(seq, user, comment))
+    return time.perf_counter() - started
+
+
+async def drain(connector, twitch, timeout):
+    deadline = time.perf_counter() + timeout
+    last = -1
+    while time.perf_counter() < deadline:
+        outbound = connector.outbound_stats() or {"depth": 0}
+        idle = connector.pipeline.depth() == 0 and outbound["depth"] == 0
+        if idle and twitch.messages == last:
+            return
+        last = twitch.messages
+        await asyncio.sleep(0.25)
+
+
+async def run_benchmark(args):
+    submitted = {}
+    latency = Histogram()
+    seen = set()
+
+    def on_message(channel, text, at):
+        for match in SEQUENCE.finditer(text):
+            seq = int(match.group(1))
+            if seq in submitted and seq not in seen:
+                seen.add(seq)
+                latency.record(at - submitted[seq])
+
+    twitch = await FakeTwitch(on_message).start(port=args.twitch_port)
+    mod = None
+    if not args.no_mod:
+        mod = await FakeDumbRequestManager(latency=args.mod_latency / 1000).start(
+            http_port=args.mod_http_port, ws_port=args.mod_ws_port
+        )
+
+    errors = []
+    connector = Connector(bench_config(args), log=lambda message, source: errors.append(message) if source == "error" else None)
+    connector.prepare_loop()
+    channel = await IrcChannel.connect(CHANNEL, port=twitch.port)
+    connector.build_outboxes([CHANNEL], lambda name: channel)
+    connector.pipeline = connector.build_pipeline()
+    if mod is not None:
+        async with connector.mod_lock:
+            await connector.start_mod()
+        # give the WebSocket a moment so the queue mirror is live before the load starts
+        await asyncio.sleep(0.5)
+
+    tasks = [asyncio.ensure_future(outbox.run()) for outbox in connector.outboxes.values()]
+    tasks.extend(asyncio.ensure_future(task) for task in connector.relay_tasks())
+
+    comments = recorded_comments(args.replay, args.speed) if args.replay else synthetic_comments(args)
+    gc.collect()
+    if args.tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        feed_seconds = await feed(connector.make_comment_handler(SOURCE), comments, args.rate, submitted)
+        await drain(connector, twitch, args.drain_timeout)
+        elapsed = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    finally:
+        if args.tracemalloc:
+            tracemalloc.stop()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await connector.shutdown_mod()
+        connector.running = False
+        await channel.close()
+        await twitch.close()
+        if mod is not None:
+            await mod.close()
+
+    outbound = connector.outbound_stats()
+    p50, p90, p99, p999 = latency.percentiles()
+    return {
+        "label": args.label,
+        "comments": len(submitted),
+        "target_rate": None if args.replay else args.rate,
+        "feed_seconds": round(feed_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "input_per_second": round(len(submitted) / feed_seconds, 1) if feed_seconds else None,
+        "relayed_per_second": round(len(seen) / elapsed, 1) if elapsed else None,
+        "twitch_messages": twitch.messages,
+        "twitch_messages_per_second": round(twitch.messages / elapsed, 1) if elapsed else None,
+        "latency_p50_ms": round(p50 * 1000, 3),
+        "latency_p99_ms": round(p99 * 1000, 3),
+        "latency_max_ms": round(latency.max * 1000, 3),
+        "mod_requests": mod.requests if mod is not None else 0,
+        "mod_action_p99_ms": _snapshot_p99(connector, "layconnector_mod_action_seconds"),
+        "pipeline_dropped": connector.pipeline.dropped(),
+        "outbox_dropped": outbound["dropped_mirror"] + outbound["dropped_response"] + outbound["dropped_offline"],
+        "lost": len(submitted) - len(seen),
+        "errors": len(errors),
+        "peak_rss_mb": round(rss_megabytes(), 1) if rss_megabytes() is not None else None,
+        "traced_peak_mb": round(traced_peak / 1024 / 1024, 2) if traced_peak is not None else None,
+    }
+
+
+def _snapshot_p99(connector, name):
+    worst = None
+    for metric, labels, count, percentiles, maximum in connector.metrics.snapshot():
+        if metric == name and count:
+            worst = max(worst or 0, percentiles[2])
+    return round(worst * 1000, 3) if worst is not None else None
+
+
+def print_report(report):
+    for key, value in report.items():
+        print(f"  {key:<28}{value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay TikTok comments through the relay against local fake servers.")
+    parser.add_argument("--rate", type=float, default=500, help="synthetic comments per second")
+    parser.add_argument("--count", type=int, default=5000, help="number of synthetic comments")
+    parser.add_argument("--users", type=int, default=300, help="distinct synthetic viewers")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trigger-ratio", type=float, default=0.1, help="share of comments that fire !hi")
+    parser.add_argument("--mod-ratio", type=float, default=0.05,
+                        help="share of comments that add a map, and again that look up the queue")
+    parser.add_argument("--replay", help="JSON lines file of recorded comments (nickname, comment, optional offset)")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed for --replay offsets")
+    parser.add_argument("--no-mod", action="store_true", help="run without the DumbRequestManager stub")
+    parser.add_argument("--mod-latency", type=float, default=2.0, help="artificial stub latency in milliseconds")
+    parser.add_argument("--twitch-rate", type=int, default=100000, help="outbound messages per second allowed")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--drain-timeout", type=float, default=10.0)
+    parser.add_argument("--twitch-port", type=int, default=TWITCH_IRC_PORT)
+    parser.add_argument("--mod-http-port", type=int, default=MOD_HTTP_PORT)
+    parser.add_argument("--mod-ws-port", type=int, default=MOD_WS_PORT)
+    parser.add_argument("--tracemalloc", action="store_true", help="also report traced Python allocations (slower)")
+    parser.add_argument("--label", default="", help="name for this run in the report")
+    parser.add_argument("--json", help="append the report as a JSON line to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
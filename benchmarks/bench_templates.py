@@ -0,0 +1,55 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from templates import compile_template
+
+SHORT_RESPONSES = [
+    "Hello {username}!",
+    "Check out {userinput} at https://twitch.tv/{userinput}",
+    "Thanks for the request {username}, {userinput} is now in the queue.",
+    "No placeholders here at all, just a static response for the trigger.",
+]
+
+LONG_RESPONSES = [
+    "Welcome to the stream {username}! " + "Please read the rules and have fun in chat. " * 8,
+    "Hey {username}, you asked about {userinput}. " + "Requests are played in order, one per viewer. " * 8,
+]
+
+
+def replace_chain(responses, username, user_input):
+    return [cmd.replace("{userinput}", user_input).replace("{username}", username) for cmd in responses]
+
+
+def compiled(templates, username, user_input):
+    return [template.render(username, user_input) for template in templates]
+
+
+def bench(label, responses, number):
+    templates = [compile_template(response) for response in responses]
+    username = "CoolViewer"
+    user_input = "1a2b3c"
+    assert replace_chain(responses, username, user_input) == compiled(templates, username, user_input)
+
+    print(f"{label} ({len(responses)} responses)")
+    compile_runs = max(number // 100, 1)
+    compile_time = timeit.timeit(lambda: [compile_template(r) for r in responses], number=compile_runs)
+    print(f"  {'compile (once per edit)':<24}{compile_time / compile_runs * 1e6:>10.2f} us per action")
+    runs = {
+        "str.replace chain": lambda: replace_chain(responses, username, user_input),
+        "compiled template": lambda: compiled(templates, username, user_input),
+    }
+    for name, func in runs.items():
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"  {name:<24}{best / number * 1e6:>10.2f} us per trigger")
+
+
+def main(number=200000):
+    bench("short responses", SHORT_RESPONSES, number)
+    bench("long responses", LONG_RESPONSES, number)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
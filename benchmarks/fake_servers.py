@@ -0,0 +1,220 @@
+import asyncio
+import json
+import random
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+MOD_HTTP_PORT = 13337
+MOD_WS_PORT = 13338
+TWITCH_IRC_PORT = 16667
+
+
+async def _finish_handlers(handlers):
+    # closing the transport makes each handler read EOF and return on its own
+    for task, writer in list(handlers):
+        writer.close()
+    await asyncio.gather(*(task for task, writer in list(handlers)), return_exceptions=True)
+
+
+class FakeTwitch:
+    def __init__(self, on_message=None):
+        self.on_message = on_message
+        self.server = None
+        self.port = None
+        self.messages = 0
+        self.bytes = 0
+        self.handlers = set()
+
+    async def start(self, host="127.0.0.1", port=TWITCH_IRC_PORT):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def handle(self, reader, writer):
+        self.handlers.add((asyncio.current_task(), writer))
+        nick = "benchbot"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode("utf-8", "replace").rstrip("\r\n")
+                command, _, rest = line.partition(" ")
+                if command == "NICK":
+                    nick = rest.strip()
+                    writer.write(f":tmi.twitch.tv 001 {nick} :Welcome, GLHF!\r\n"
+                                 f":tmi.twitch.tv 376 {nick} :>\r\n".encode())
+                elif command == "JOIN":
+                    channel = rest.strip()
+                    writer.write(f":{nick}!{nick}@{nick}.tmi.twitch.tv JOIN {channel}\r\n"
+                                 f":{nick}.tmi.twitch.tv 366 {nick} {channel} :End of /NAMES list\r\n".encode())
+                elif command == "PING":
+                    writer.write(f"PONG {rest}\r\n".encode())
+                elif command == "PRIVMSG":
+                    channel, _, text = rest.partition(" :")
+                    self.messages += 1
+                    self.bytes += len(text)
+                    if self.on_message:
+                        self.on_message(channel, text, time.perf_counter())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self.handlers.discard((asyncio.current_task(), writer))
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await _finish_handlers(self.handlers)
+            await self.server.wait_closed()
+
+
+class IrcChannel:
+    def __init__(self, name, reader, writer):
+        self.name = name
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, name, host="127.0.0.1", port=TWITCH_IRC_PORT, nick="benchbot"):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f"PASS oauth:bench\r\nNICK {nick}\r\nJOIN #{name}\r\n".encode())
+        await writer.drain()
+        return cls(name, reader, writer)
+
+    async def send(self, text):
+        self.writer.write(f"PRIVMSG #{self.name} :{text}\r\n".encode("utf-8"))
+        await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+
+
+class FakeDumbRequestManager:
+    def __init__(self, latency=0.0, max_queue=500):
+        self.latency = latency
+        self.max_queue = max_queue
+        self.queue = []
+        self.history = []
+        self.is_open = True
+        self.sockets = set()
+        self.requests = 0
+        self.events = 0
+        self.http_server = None
+        self.ws_server = None
+        self.handlers = set()
+
+    async def start(self, host="127.0.0.1", http_port=MOD_HTTP_PORT, ws_port=MOD_WS_PORT):
+        import websockets
+
+        self.http_server = await asyncio.start_server(self.handle_http, host, http_port)
+        self.ws_server = await websockets.serve(self.handle_ws, host, ws_port)
+        return self
+
+    async def close(self):
+        for server in (self.http_server, self.ws_server):
+            if server is not None:
+                server.close()
+        await _finish_handlers(self.handlers)
+        for server in (self.http_server, self.ws_server):
+            if server is not None:
+                await server.wait_closed()
+
+    async def handle_ws(self, websocket, *args):
+        self.sockets.add(websocket)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.sockets.discard(websocket)
+
+    def broadcast(self, event_type, data):
+        message = json.dumps({"EventType": event_type, "Timestamp": int(time.time() * 1000), "Data": data})
+        self.events += 1
+        for websocket in list(self.sockets):
+            asyncio.ensure_future(websocket.send(message))
+
+    async def handle_http(self, reader, writer):
+        self.handlers.add((asyncio.current_task(), writer))
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                parts = request.decode("latin-1").split()
+                if len(parts) < 2:
+                    break
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, data = self.route(parts[1])
+                body = json.dumps(data).encode("utf-8")
+                reason = "OK" if status == 200 else "Not Found"
+                writer.write(
+                    f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self.handlers.discard((asyncio.current_task(), writer))
+
+    def route(self, target):
+        self.requests += 1
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        path = [unquote(part) for part in url.path.strip("/").split("/")]
+
+        if path == ["queue"]:
+            return 200, self.queue
+        if path[:2] == ["queue", "where"] and len(path) == 3:
+            user = path[2].lower()
+            return 200, [
+                dict(entry, Spot=spot) for spot, entry in enumerate(self.queue, 1)
+                if entry["User"].lower() == user
+            ]
+        if path == ["history"]:
+            limit = int(query.get("limit", ["10"])[0])
+            return 200, self.history[:limit]
+        if path[0] == "query" and len(path) == 2:
+            return 200, {"Title": f"Map {path[1]}", "Mapper": "bench", "BsrKey": path[1]}
+        if path[0] == "addKey" and len(path) == 2:
+            entry = {
+                "Hash": f"{path[1]}-{self.requests}",
+                "BsrKey": path[1],
+                "Title": f"Map {path[1]}",
+                "Mapper": "bench",
+                "User": query.get("user", ["bench"])[0],
+            }
+            self.queue.append(entry)
+            self.broadcast("requestAdded", entry)
+            if len(self.queue) > self.max_queue:
+                self.play()
+            return 200, entry
+        if path == ["queue", "clear"]:
+            self.queue = []
+            self.broadcast("queueCleared", None)
+            return 200, {}
+        if path[:2] == ["queue", "open"] and len(path) == 3:
+            self.is_open = path[2] == "true"
+            self.broadcast("queueOpen", self.is_open)
+            return 200, {}
+        if path[:2] == ["queue", "move"] and len(path) == 4:
+            self.broadcast("queueMoved", None)
+            return 200, {}
+        if path == ["queue", "shuffle"]:
+            random.shuffle(self.queue)
+            self.broadcast("queueShuffled", None)
+            return 200, {}
+        return 404, {}
+
+    def play(self):
+        if not self.queue:
+            return
+        entry = self.queue.pop(0)
+        self.history.insert(0, {"HistoryItem": entry})
+        del self.history[50:]
+        self.broadcast("pressedPlay", entry)
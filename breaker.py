@@ -0,0 +1,109 @@
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 5.0
+DEFAULT_MAX_RESET_TIMEOUT = 60.0
+DEFAULT_HALF_OPEN_PROBES = 1
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 max_reset_timeout=DEFAULT_MAX_RESET_TIMEOUT, half_open_probes=DEFAULT_HALF_OPEN_PROBES,
+                 on_change=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.half_open_probes = half_open_probes
+        self.on_change = on_change
+        self.clock = clock
+
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self.opened_at = 0.0
+        self.probes = 0
+
+        self.trips = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_settings(cls, settings, on_change=None):
+        return cls(
+            failure_threshold=settings.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD),
+            reset_timeout=settings.get("reset_timeout", DEFAULT_RESET_TIMEOUT),
+            max_reset_timeout=settings.get("max_reset_timeout", DEFAULT_MAX_RESET_TIMEOUT),
+            half_open_probes=settings.get("half_open_probes", DEFAULT_HALF_OPEN_PROBES),
+            on_change=on_change,
+        )
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        if self.on_change:
+            self.on_change(self)
+
+    def _open(self):
+        self.opened_at = self.clock()
+        self.probes = 0
+        self.trips += 1
+        self._set_state(OPEN)
+
+    def retry_in(self):
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def allow(self):
+        if self.state == OPEN and self.retry_in() <= 0:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and self.probes < self.half_open_probes:
+            self.probes += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != CLOSED:
+            self.reset_timeout = self.base_reset_timeout
+            self.probes = 0
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            # a failed probe means it is still down, so wait longer before the next one
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self._open()
+            return
+        self.failures += 1
+        if self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def trip(self):
+        if self.state != OPEN:
+            self._open()
+
+    def probe_now(self):
+        if self.state == OPEN:
+            self.probes = 0
+            self._set_state(HALF_OPEN)
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_in": self.retry_in(),
+        }
@@ -0,0 +1,160 @@
+import json
+import os
+import re
+import tempfile
+
+from triggers import MATCH_ALL, MATCH_LONGEST, PREFIX, TRIGGER_TYPES, compile_pattern
+
+
+def default_config_dir():
+    appdata = os.getenv("APPDATA")
+    if appdata:
+        return os.path.join(appdata, "layconnector")
+    config_home = os.getenv("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(config_home, "layconnector")
+
+
+CONFIG_DIR = default_config_dir()
+CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+
+
+def default_config():
+    return {
+        "tiktok_username": "",
+        "twitch_username": "",
+        "twitch_token": "",
+        "actions": [],
+        "mod_enabled": False,
+        "mod_settings": {
+            "http_url": "http://localhost:13337",
+            "websocket_url": "ws://localhost:13338"
+        }
+    }
+
+
+def is_configured(cfg):
+    if not cfg["twitch_token"]:
+        return False
+    return all(
+        (route.get("tiktok") or cfg["tiktok_username"]) and (route.get("twitch") or cfg["twitch_username"])
+        for route in cfg.get("routes") or [{}]
+    )
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _check(value, types, where):
+    if not isinstance(value, types):
+        names = " or ".join(t.__name__ for t in (types if isinstance(types, tuple) else (types,)))
+        raise ConfigError(f"{where} must be a {names}, got {type(value).__name__}")
+    return value
+
+
+def _validate_action(act, where):
+    _check(act, dict, where)
+    trigger = _check(act.get("trigger"), str, f"{where}.trigger")
+    if not trigger.strip():
+        raise ConfigError(f"{where}.trigger must not be empty")
+    trigger_type = _check(act.get("trigger_type", PREFIX), str, f"{where}.trigger_type")
+    if trigger_type not in TRIGGER_TYPES:
+        raise ConfigError(f"{where}.trigger_type must be one of {', '.join(TRIGGER_TYPES)}")
+    if trigger_type != PREFIX:
+        try:
+            compile_pattern(trigger, trigger_type)
+        except (ValueError, re.error) as e:
+            raise ConfigError(f"{where}.trigger is not a valid {trigger_type}: {e}") from e
+    for n, response in enumerate(_check(act.get("responses", []), list, f"{where}.responses")):
+        _check(response, str, f"{where}.responses[{n}]")
+    _check(act.get("use_mod", False), bool, f"{where}.use_mod")
+    mod_action = act.get("mod_action")
+    if mod_action is not None:
+        _check(mod_action, dict, f"{where}.mod_action")
+        _check(mod_action.get("type", "query"), str, f"{where}.mod_action.type")
+        _check(mod_action.get("params", {}), dict, f"{where}.mod_action.params")
+        if mod_action.get("concurrency") is not None:
+            if _check(mod_action["concurrency"], int, f"{where}.mod_action.concurrency") < 1:
+                raise ConfigError(f"{where}.mod_action.concurrency must be at least 1")
+        if mod_action.get("timeout") is not None:
+            if _check(mod_action["timeout"], (int, float), f"{where}.mod_action.timeout") <= 0:
+                raise ConfigError(f"{where}.mod_action.timeout must be positive")
+        _check(mod_action.get("ordered", False), bool, f"{where}.mod_action.ordered")
+    cooldown = act.get("cooldown")
+    if cooldown is not None:
+        _check(cooldown, dict, f"{where}.cooldown")
+        for key, value in cooldown.items():
+            _check(value, (int, float), f"{where}.cooldown.{key}")
+
+
+def _validate_trigger_match(value, where):
+    if _check(value, str, where) not in (MATCH_ALL, MATCH_LONGEST):
+        raise ConfigError(f"{where} must be {MATCH_ALL} or {MATCH_LONGEST}")
+
+
+def _validate_route(route, where):
+    _check(route, dict, where)
+    _check(route.get("name", ""), str, f"{where}.name")
+    for key in ("tiktok", "twitch"):
+        names = _check(route.get(key, []), (str, list), f"{where}.{key}")
+        if isinstance(names, list):
+            for n, name in enumerate(names):
+                _check(name, str, f"{where}.{key}[{n}]")
+    _check(route.get("mirror", True), bool, f"{where}.mirror")
+    if "trigger_match" in route:
+        _validate_trigger_match(route["trigger_match"], f"{where}.trigger_match")
+    for n, act in enumerate(_check(route.get("actions", []), list, f"{where}.actions")):
+        _validate_action(act, f"{where}.actions[{n}]")
+
+
+def validate_config(cfg):
+    _check(cfg, dict, "config")
+    validated = default_config()
+    validated.update(cfg)
+    for key in ("tiktok_username", "twitch_username", "twitch_token"):
+        _check(validated[key], str, key)
+    _check(validated["mod_enabled"], bool, "mod_enabled")
+    mod_settings = default_config()["mod_settings"]
+    mod_settings.update(_check(validated["mod_settings"], dict, "mod_settings"))
+    validated["mod_settings"] = mod_settings
+    for key in ("http_url", "websocket_url"):
+        _check(mod_settings[key], str, f"mod_settings.{key}")
+    _validate_trigger_match(validated.get("trigger_match", MATCH_ALL), "trigger_match")
+    for n, act in enumerate(_check(validated["actions"], list, "actions")):
+        _validate_action(act, f"actions[{n}]")
+    for n, route in enumerate(_check(validated.get("routes", []), list, "routes")):
+        _validate_route(route, f"routes[{n}]")
+    return validated
+
+
+def load_config(path=CONFIG_FILE):
+    with open(path, "r") as f:
+        try:
+            cfg = json.load(f)
+        except ValueError as e:
+            raise ConfigError(f"{path} is not valid JSON: {e}") from e
+    return validate_config(cfg)
+
+
+def ensure_config(path=CONFIG_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if not os.path.exists(path):
+        save_config(default_config(), path)
+    return load_config(path)
+
+
+def save_config(cfg, path=CONFIG_FILE):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(cfg, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import re
+
+from config import ConfigError, load_config
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class ConfigWatcher:
+    def __init__(self, path, on_change, interval=DEFAULT_POLL_INTERVAL, log=None):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.log = log
+        self.signature = self._signature()
+        self.reloads = 0
+        self.rejected = 0
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self):
+        signature = self._signature()
+        if signature is None or signature == self.signature:
+            return False
+        self.signature = signature
+
+        try:
+            cfg = load_config(self.path)
+        except (OSError, ConfigError) as e:
+            self.rejected += 1
+            if self.log:
+                self.log(f"Ignoring config change: {str(e)}")
+            return False
+
+        try:
+            self.on_change(cfg)
+        except (ValueError, re.error) as e:
+            self.rejected += 1
+            if self.log:
+                self.log(f"Ignoring config change: {str(e)}")
+            return False
+        self.reloads += 1
+        return True
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            await loop.run_in_executor(None, self.check)
@@ -0,0 +1,911 @@
+import asyncio
+import functools
+import json
+import re
+import time
+
+from archive import CommentArchive
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from configwatch import ConfigWatcher
+from cooldowns import CooldownEngine
+from dedup import SpamCollapser
+from executor import ActionExecutor
+from metrics import Metrics, MetricsServer
+from modclient import ModClient
+from modqueue import QueueMirror
+from outbound import OutboundQueue
+from pipeline import Pipeline
+from reconnect import Backoff, ReconnectStats
+from routes import RouteTable
+from templates import render_params
+
+
+QUEUE_ENDPOINTS = ("queue", "where")
+RESTART_KEYS = ("twitch_token", "outbound", "pipeline", "dedup", "archive", "executor")
+DEFAULT_PING_INTERVAL = 20
+DEFAULT_PING_TIMEOUT = 20
+BREAKER_PROBE_INTERVAL = 1.0
+
+
+def _ignore_log(message, source):
+    pass
+
+
+def _ignore_status(target, status, color):
+    pass
+
+
+def _ignore_config(cfg):
+    pass
+
+
+class Connector:
+    def __init__(self, cfg, log=None, status=None, config_path=None, on_config=None):
+        self.cfg = cfg
+        self.log = log or _ignore_log
+        self.status = status or _ignore_status
+        self.config_path = config_path
+        self.on_config = on_config or _ignore_config
+        self.running = False
+        self.mod_ws = None
+        self.mod_client = None
+        self.mod_breaker = None
+        self.mod_breaker_opened = None
+        self.queue_mirror = None
+        self.mod_tasks = []
+        self.mod_lock = None
+        self.mod_restart = None
+        self.supervisor = None
+        self.mod_ws_stats = ReconnectStats()
+        self.loop = None
+        self.outboxes = {}
+        self.pipeline = None
+        self.dedup = None
+        self.archive = None
+        self.executor = None
+        self.routes = RouteTable.from_config(cfg, version=1)
+        self.tiktok_connected = set()
+        self.counters = {}
+        self.metrics = Metrics()
+        self.metrics.register(self.collect_metrics)
+        self.cooldowns = CooldownEngine.from_settings(cfg.get("cooldowns", {}))
+
+    def log_message(self, message, source="system"):
+        self.log(message, source)
+
+    def set_status(self, target, status, color):
+        self.status(target, status, color)
+
+    def apply_config(self, cfg):
+        if cfg == self.cfg:
+            return False
+        try:
+            routes = RouteTable.from_config(cfg)
+        except (ValueError, re.error) as e:
+            # the running actions stay in place until a config that compiles arrives
+            self.log_message(f"Could not apply config, keeping action set v{self.routes.version}: {str(e)}", "error")
+            return False
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(self.install_config, cfg, routes)
+                return True
+        self.install_config(cfg, routes)
+        return True
+
+    def install_config(self, cfg, routes):
+        previous = self.cfg
+        previous_topology = self.routes.topology()
+        routes.version = self.routes.version + 1
+        self.cfg = cfg
+        self.routes = routes
+        self.log_message(
+            f"Applied action set v{routes.version} ({routes.action_count()} actions, {len(routes)} routes)", "system"
+        )
+
+        if not self.running:
+            return
+        if (any(cfg.get(key) != previous.get(key) for key in RESTART_KEYS)
+                or routes.topology() != previous_topology):
+            self.log_message("Connection settings changed; restart the connector to use them", "system")
+        if (cfg.get("mod_enabled", False) != previous.get("mod_enabled", False)
+                or cfg.get("mod_settings") != previous.get("mod_settings")):
+            if self.mod_restart is not None:
+                self.mod_restart.cancel()
+            self.mod_restart = asyncio.ensure_future(self.restart_mod())
+
+    def on_config_file_changed(self, cfg):
+        if self.apply_config(cfg):
+            self.on_config(cfg)
+
+    def prepare_loop(self):
+        self.running = True
+        self.loop = asyncio.get_running_loop()
+        self.mod_lock = asyncio.Lock()
+
+    async def run(self):
+        self.prepare_loop()
+        tiks = []
+        bot = None
+        try:
+            from twitchio.ext.commands import Bot
+            
+            routes = self.routes
+            self.tiktok_connected = set()
+            shard_settings = self.cfg.get("sharding", {})
+            if shard_settings.get("workers", 0) > 1:
+                from sharding import ShardSupervisor
+                
+                self.supervisor = ShardSupervisor.from_settings(
+                    shard_settings,
+                    self.cfg,
+                    routes.sources(),
+                    self.config_path,
+                    self.handle_shard_messages,
+                    log=self.log_message
+                )
+            else:
+                tiks = self.make_tiktok_clients(routes.sources(), len(routes.sources()))
+            
+            bot = Bot(
+                token=self.cfg["twitch_token"],
+                prefix="!",
+                initial_channels=routes.channels()
+            )
+            
+            @bot.event()
+            async def event_ready():
+                self.log_message(f"Connected to Twitch as {bot.nick}", "twitch")
+                self.set_status("twitch", "Connected", "green")
+            
+            self.build_outboxes(routes.channels(), bot.get_channel)
+            
+            tasks = [
+                self.run_tiktok_source(source, tik, len(tiks)) for source, tik in zip(routes.sources(), tiks)
+            ]
+            tasks.append(bot.start())
+            tasks.extend(outbox.run() for outbox in self.outboxes.values())
+            if self.supervisor is not None:
+                # shard workers hand their mod jobs to this process, which runs them with the usual limits
+                self.executor = self.build_executor()
+                tasks.extend([self.supervisor.run(), self.executor.run()])
+            else:
+                self.pipeline = self.build_pipeline()
+                tasks.extend(self.relay_tasks())
+            
+            if self.config_path:
+                tasks.append(self.watch_config())
+            metrics_settings = self.cfg.get("metrics", {})
+            if metrics_settings.get("enabled", False):
+                server = MetricsServer.from_settings(
+                    metrics_settings,
+                    self.metrics,
+                    log=lambda message: self.log_message(message, "system")
+                )
+                tasks.append(self.serve_metrics(server))
+            if self.cfg.get("mod_enabled", False):
+                async with self.mod_lock:
+                    await self.start_mod()
+                
+            await asyncio.gather(*tasks)
+            
+        except asyncio.CancelledError:
+            self.log_message("Connections stopped")
+        except Exception as e:
+            self.log_message(f"Error in connector: {str(e)}", "error")
+        finally:
+            await self.shutdown_mod()
+            for tik in tiks:
+                try:
+                    await tik.disconnect()
+                except Exception:
+                    pass
+            if bot is not None:
+                try:
+                    await bot.close()
+                except Exception:
+                    pass
+            self.running = False
+            self.loop = None
+            self.outboxes = {}
+            self.pipeline = None
+            self.dedup = None
+            self.archive = None
+            self.executor = None
+            self.supervisor = None
+
+    async def start_mod(self):
+        self.mod_ws = None
+        self.mod_breaker_opened = asyncio.Event()
+        self.mod_breaker = CircuitBreaker.from_settings(
+            self.cfg["mod_settings"].get("breaker", {}),
+            on_change=self.mod_breaker_changed
+        )
+        self.mod_client = ModClient.from_settings(self.cfg["mod_settings"], metrics=self.metrics, breaker=self.mod_breaker)
+        try:
+            self.log_message("Testing DumbRequestManager HTTP connection...", "mod")
+            status, _ = await self.mod_client.get("/queue")
+            if status == 200:
+                self.log_message("DumbRequestManager HTTP connection successful", "mod")
+                self.set_status("mod", "HTTP Connected", "green")
+            else:
+                self.log_message(f"DumbRequestManager HTTP connection failed: Status {status}", "error")
+                self.set_status("mod", "HTTP Error", "orange")
+        except Exception as e:
+            self.log_message(f"DumbRequestManager HTTP connection failed: {str(e)}", "error")
+            self.set_status("mod", "Connection Error", "red")
+        
+        self.mod_tasks = [
+            asyncio.ensure_future(self.connect_mod_websocket()),
+            asyncio.ensure_future(self.probe_mod())
+        ]
+        mirror_settings = self.cfg["mod_settings"].get("queue_mirror", {})
+        if mirror_settings.get("enabled", True):
+            self.queue_mirror = QueueMirror.from_settings(
+                mirror_settings,
+                self.mod_client,
+                log=lambda message: self.log_message(message, "error")
+            )
+            self.mod_tasks.append(asyncio.ensure_future(self.queue_mirror.run()))
+        for task in self.mod_tasks:
+            task.add_done_callback(self.on_mod_task_done)
+
+    async def stop_mod(self):
+        tasks, self.mod_tasks = self.mod_tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        client = self.mod_client
+        self.mod_client = None
+        self.mod_breaker = None
+        self.mod_breaker_opened = None
+        self.mod_ws = None
+        self.queue_mirror = None
+        return client
+
+    async def shutdown_mod(self):
+        if self.mod_restart is not None:
+            self.mod_restart.cancel()
+            await asyncio.gather(self.mod_restart, return_exceptions=True)
+            self.mod_restart = None
+        async with self.mod_lock:
+            client = await self.stop_mod()
+        if client is not None:
+            await client.close()
+
+    async def restart_mod(self):
+        old_client = None
+        try:
+            async with self.mod_lock:
+                if not self.running:
+                    return
+                old_client = await self.stop_mod()
+                if self.cfg.get("mod_enabled", False):
+                    self.log_message("DumbRequestManager settings changed, reconnecting", "mod")
+                    await self.start_mod()
+                else:
+                    self.set_status("mod", "Disabled", "gray")
+            if old_client is not None:
+                # let dispatches that already hold the old client finish their request
+                await asyncio.sleep(old_client.request_timeout)
+        finally:
+            if old_client is not None:
+                await old_client.close()
+
+    def mod_breaker_changed(self, breaker):
+        if breaker is not self.mod_breaker:
+            return
+        if breaker.state == OPEN:
+            self.mod_breaker_opened.set()
+            self.log_message(
+                f"DumbRequestManager is not responding, skipping mod actions for {breaker.reset_timeout:.0f} seconds", "error"
+            )
+            self.set_status("mod", f"Unavailable, retrying in {breaker.reset_timeout:.0f}s", "red")
+        elif breaker.state == HALF_OPEN:
+            self.set_status("mod", "Checking...", "orange")
+        else:
+            self.log_message("DumbRequestManager is responding again", "mod")
+            self.set_status("mod", "Connected" if self.mod_ws is not None else "HTTP Connected", "green")
+
+    async def probe_mod(self):
+        breaker = self.mod_breaker
+        client = self.mod_client
+        opened = self.mod_breaker_opened
+        # actions would probe on their own, but without chat traffic the breaker would stay open forever
+        while True:
+            await opened.wait()
+            opened.clear()
+            while breaker.state != CLOSED:
+                await asyncio.sleep(max(breaker.retry_in(), BREAKER_PROBE_INTERVAL))
+                if breaker.state == CLOSED:
+                    break
+                try:
+                    await client.get("/queue")
+                except Exception:
+                    pass
+
+    async def check_mod_http(self):
+        breaker = self.mod_breaker
+        client = self.mod_client
+        if breaker is None or breaker.state != CLOSED:
+            return
+        # a lost or unreachable WebSocket only opens the breaker when the HTTP API is failing too
+        try:
+            status, _ = await client.get("/queue")
+        except Exception:
+            status = None
+        if status is None or status >= 500:
+            breaker.trip()
+
+    def on_mod_task_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            self.log_message(f"DumbRequestManager task failed: {str(task.exception())}", "error")
+
+    def build_outboxes(self, channels, get_channel):
+        outbound_settings = self.cfg.get("outbound", {})
+        window = OutboundQueue.shared_window(outbound_settings)
+        for channel in channels:
+            self.outboxes[channel] = OutboundQueue.from_settings(
+                outbound_settings,
+                lambda channel=channel: get_channel(channel),
+                log=lambda message: self.log_message(message, "error"),
+                window=window,
+                metrics=self.metrics,
+                name=channel
+            )
+
+    def build_executor(self):
+        return ActionExecutor.from_settings(
+            self.cfg.get("executor", {}),
+            log=lambda message: self.log_message(message, "error")
+        )
+
+    def build_pipeline(self):
+        self.executor = self.build_executor()
+        stages = [("ingest", self.ingest_comment)]
+        dedup_settings = self.cfg.get("dedup", {})
+        if dedup_settings.get("enabled", False):
+            self.dedup = SpamCollapser.from_settings(dedup_settings, self.mirror_summary)
+            stages.append(("dedup", self.dedup_comment))
+        archive_settings = self.cfg.get("archive", {})
+        if archive_settings.get("enabled", False):
+            self.archive = CommentArchive.from_settings(
+                archive_settings,
+                log=lambda message: self.log_message(message, "error")
+            )
+        stages += [
+            ("match", self.match_comment),
+            ("render", self.render_comment),
+            ("dispatch", self.dispatch_comment, 4),
+        ]
+        return Pipeline.from_settings(
+            self.cfg.get("pipeline", {}),
+            stages,
+            log=lambda message: self.log_message(message, "error"),
+            metrics=self.metrics
+        )
+
+    def relay_tasks(self):
+        tasks = [self.pipeline.run(), self.executor.run()]
+        if self.dedup is not None:
+            tasks.append(self.dedup.run())
+        if self.archive is not None:
+            tasks.append(self.archive.run())
+        return tasks
+
+    async def serve_metrics(self, server):
+        # metrics are optional, so a busy port or a crashed server must not stop the relay
+        try:
+            await server.run()
+        except Exception as e:
+            self.log_message(f"Metrics server stopped: {str(e)}", "error")
+
+    def watch_config(self):
+        watcher = ConfigWatcher(
+            self.config_path,
+            self.on_config_file_changed,
+            log=lambda message: self.log_message(message, "error")
+        )
+        return watcher.run()
+
+    def make_tiktok_clients(self, sources, total):
+        from TikTokLive import TikTokLiveClient
+        from TikTokLive.events import ConnectEvent, CommentEvent
+        
+        tiks = []
+        for source in sources:
+            tik = TikTokLiveClient(unique_id=source)
+            tik.on(ConnectEvent)(self.make_connect_handler(source, total))
+            tik.on(CommentEvent)(self.make_comment_handler(source))
+            tiks.append(tik)
+        return tiks
+
+    async def run_tiktok_source(self, source, tik, total):
+        backoff = Backoff.from_settings(self.cfg.get("tiktok_reconnect", {}))
+        # one source that is offline or failing must not take down the other routes and the Twitch bot
+        while True:
+            try:
+                task = await tik.start()
+                if isinstance(task, asyncio.Future):
+                    await task
+                self.log_message(f"TikTok @{source} disconnected", "tiktok")
+            except Exception as e:
+                self.log_message(f"TikTok @{source} connection failed: {str(e)}", "error")
+            if source in self.tiktok_connected:
+                backoff.reset()
+            self.tiktok_source_disconnected(source, total)
+            try:
+                await tik.disconnect()
+            except Exception:
+                pass
+
+            delay = backoff.next_delay()
+            self.log_message(f"Reconnecting to TikTok @{source} in {delay:.1f} seconds...", "tiktok")
+            await asyncio.sleep(delay)
+
+    def make_connect_handler(self, source, total):
+        async def on_tik_connect(evt):
+            self.tiktok_source_connected(source, evt.unique_id, total)
+        return on_tik_connect
+
+    def tiktok_source_connected(self, source, unique_id, total):
+        self.tiktok_connected.add(source)
+        self.log_message(f"Connected to TikTok @{unique_id}", "tiktok")
+        self.update_tiktok_status(total)
+
+    def tiktok_source_disconnected(self, source, total):
+        self.tiktok_connected.discard(source)
+        self.update_tiktok_status(total)
+
+    def update_tiktok_status(self, total):
+        if len(self.tiktok_connected) >= total:
+            self.set_status("tiktok", "Connected", "green")
+        elif self.tiktok_connected:
+            self.set_status("tiktok", f"Connected {len(self.tiktok_connected)}/{total}", "orange")
+        else:
+            self.set_status("tiktok", "Reconnecting...", "orange")
+
+    def handle_shard_messages(self, messages):
+        for message in messages:
+            kind = message[0]
+            if kind == "mirror" or kind == "send":
+                outbox = self.outboxes.get(message[1])
+                if outbox is not None:
+                    getattr(outbox, kind)(message[2], message[3])
+            elif kind == "mod":
+                key, action_type, params, user_input, username, channels, concurrency, timeout, ordered = message[1:]
+                task = asyncio.ensure_future(self.executor.submit(
+                    key,
+                    functools.partial(self.execute_mod_action, action_type, params, user_input, username, channels),
+                    concurrency=concurrency,
+                    timeout=timeout,
+                    ordered=ordered
+                ))
+                task.add_done_callback(self.on_mod_task_done)
+            elif kind == "log":
+                self.log_message(message[1], message[2])
+            elif kind == "tiktok":
+                self.tiktok_source_connected(message[1], message[2], len(self.routes.sources()))
+            elif kind == "tiktok_lost":
+                self.tiktok_source_disconnected(message[1], len(self.routes.sources()))
+
+    def make_comment_handler(self, source):
+        async def on_comment(evt):
+            self.pipeline.submit((source, evt))
+        return on_comment
+
+    def ingest_comment(self, entry):
+        source, evt = entry
+        return {
+            "source": source,
+            "username": evt.user.nickname,
+            "user_id": getattr(evt.user, "unique_id", None) or evt.user.nickname,
+            "comment": evt.comment,
+            "received": time.monotonic(),
+        }
+
+    def dedup_comment(self, item):
+        item["collapsed"] = not self.dedup.offer(item["source"], item["username"], item["comment"])
+        return item
+
+    def mirror_summary(self, source, text):
+        mirrored = set()
+        for route in self.routes.routes_for(source):
+            if not route.mirror:
+                continue
+            for channel in route.channels:
+                outbox = self.outboxes.get(channel)
+                if outbox is not None and channel not in mirrored:
+                    mirrored.add(channel)
+                    outbox.mirror(text)
+
+    def match_comment(self, item):
+        routes = self.routes
+        user_id = item["user_id"]
+        comment = item["comment"]
+        item["version"] = routes.version
+        item["matches"] = [
+            (route, [
+                (act, args) for act, args in route.action_set.match(comment)
+                if self.cooldowns.allow((route.name, act.trigger), act.cooldown, user_id)
+            ])
+            for route in routes.routes_for(item["source"])
+        ]
+        return item
+
+    def render_comment(self, item):
+        username = item["username"]
+        comment = item["comment"]
+        # jobs are queued even while DumbRequestManager is down; the circuit breaker decides whether each call goes out
+        use_mod = self.cfg.get("mod_enabled", False)
+        item["mirror"] = None if item.get("collapsed") else f"{username}: {comment}"
+        item["deliveries"] = []
+        
+        for route, matches in item["matches"]:
+            responses = []
+            mod_jobs = []
+            for act, args in matches:
+                user_input = comment[len(act.prefix):].strip()
+                self.metrics.inc(
+                    "layconnector_action_fired_total", "Actions fired", route=route.name, trigger=act.trigger
+                )
+                
+                for template in act.responses:
+                    responses.append(template.render(username, user_input, self.counters))
+                
+                if act.use_mod and use_mod:
+                    params = render_params(act.mod_params, username, user_input, self.counters)
+                    if args:
+                        params.update(args)
+                    mod_jobs.append((act, params, user_input, username))
+            item["deliveries"].append((route, [act.trigger for act, args in matches], responses, mod_jobs))
+        return item
+
+    def action_latency(self, route, trigger):
+        return self.metrics.histogram(
+            "layconnector_action_seconds",
+            "Time from a TikTok comment arriving to its action's responses being queued and mod action finishing",
+            route=route.name,
+            trigger=trigger
+        )
+
+    async def dispatch_comment(self, item):
+        received = item["received"]
+        mirrored = set()
+        fired = []
+        jobs = []
+        for route, triggers, responses, mod_jobs in item["deliveries"]:
+            for channel in route.channels:
+                outbox = self.outboxes.get(channel)
+                if outbox is None:
+                    continue
+                if route.mirror and item["mirror"] is not None and channel not in mirrored:
+                    mirrored.add(channel)
+                    outbox.mirror(item["mirror"], received)
+                for out in responses:
+                    outbox.send(out, received)
+            
+            fired.extend(triggers)
+            mod_triggers = {job[0].trigger for job in mod_jobs}
+            for trigger in triggers:
+                if trigger not in mod_triggers:
+                    self.action_latency(route, trigger).record(time.monotonic() - received)
+            jobs.extend((route, job) for job in mod_jobs)
+        
+        item["fired"] = fired
+        item["results"] = []
+        item["pending_jobs"] = len(jobs)
+        if not jobs:
+            self.archive_comment(item)
+            return
+        # mod calls run on the executor, so this dispatch worker moves on as soon as each one has a slot
+        for route, (act, params, user_input, username) in jobs:
+            await self.submit_mod_job(item, route, act, params, user_input, username)
+
+    async def submit_mod_job(self, item, route, act, params, user_input, username):
+        await self.executor.submit(
+            (route.name, act.trigger),
+            functools.partial(self.execute_mod_action, act.mod_type, params, user_input, username, route.channels),
+            concurrency=act.mod_concurrency,
+            timeout=act.mod_timeout,
+            ordered=act.mod_ordered,
+            on_done=functools.partial(self.mod_job_done, item, route, act.trigger)
+        )
+
+    def mod_job_done(self, item, route, trigger, result):
+        self.action_latency(route, trigger).record(time.monotonic() - item["received"])
+        if result:
+            item["results"].append(result)
+        item["pending_jobs"] -= 1
+        if not item["pending_jobs"]:
+            self.archive_comment(item)
+
+    def archive_comment(self, item):
+        if self.archive is not None:
+            self.archive.record(
+                item["source"], item["username"], item["user_id"], item["comment"],
+                item["fired"], " | ".join(item["results"]) or None
+            )
+
+    def reply(self, channels, text):
+        for channel in channels:
+            outbox = self.outboxes.get(channel)
+            if outbox is not None:
+                outbox.send(text)
+
+    def collect_metrics(self):
+        samples = []
+        pipeline = self.pipeline
+        if pipeline is not None:
+            for name, stats in pipeline.stats().items():
+                samples.append(("layconnector_stage_depth", "gauge", "Items waiting in a pipeline stage", {"stage": name}, stats["depth"]))
+                samples.append(("layconnector_stage_processed_total", "counter", "Items handled by a pipeline stage", {"stage": name}, stats["processed"]))
+                samples.append(("layconnector_stage_dropped_total", "counter", "Items dropped by a pipeline stage", {"stage": name}, stats["dropped"]))
+                samples.append(("layconnector_stage_errors_total", "counter", "Errors raised in a pipeline stage", {"stage": name}, stats["errors"]))
+        for channel, outbox in list(self.outboxes.items()):
+            stats = outbox.stats()
+            samples.append(("layconnector_outbox_depth", "gauge", "Messages waiting to be sent to Twitch", {"channel": channel}, stats["depth"]))
+            samples.append(("layconnector_outbox_sent_total", "counter", "Messages sent to Twitch", {"channel": channel}, stats["sent"]))
+            samples.append(("layconnector_outbox_coalesced_total", "counter", "Mirrored comments merged into another message", {"channel": channel}, stats["coalesced"]))
+            samples.append(("layconnector_outbox_spooled", "gauge", "Messages spooled to disk while Twitch is offline", {"channel": channel}, stats["spooled"]))
+            for reason in ("mirror", "response", "offline"):
+                samples.append(("layconnector_outbox_dropped_total", "counter", "Messages dropped before reaching Twitch",
+                                {"channel": channel, "reason": reason}, stats[f"dropped_{reason}"]))
+        dedup = self.dedup
+        if dedup is not None:
+            stats = dedup.stats()
+            samples.append(("layconnector_dedup_tracked", "gauge", "Comment fingerprints held by the spam collapser", {}, stats["tracked"]))
+            samples.append(("layconnector_dedup_collapsed_total", "counter", "Repeated comments held back from the mirror", {}, stats["collapsed"]))
+            samples.append(("layconnector_dedup_summaries_total", "counter", "Collapsed repeat summaries mirrored", {}, stats["summaries"]))
+        executor = self.executor
+        if executor is not None:
+            stats = executor.stats()
+            samples.append(("layconnector_mod_jobs_in_flight", "gauge", "DumbRequestManager actions running or waiting for their action's limit", {}, stats["in_flight"]))
+            samples.append(("layconnector_mod_job_timeouts_total", "counter", "DumbRequestManager actions cancelled by their timeout", {}, stats["timeouts"]))
+        archive = self.archive
+        if archive is not None:
+            stats = archive.stats()
+            samples.append(("layconnector_archive_pending", "gauge", "Comments waiting to be written to the archive", {}, stats["pending"]))
+            samples.append(("layconnector_archive_written_total", "counter", "Comments written to the archive", {}, stats["written"]))
+            samples.append(("layconnector_archive_dropped_total", "counter", "Comments not archived because the write buffer was full", {}, stats["dropped"] + stats["failed"]))
+        cooldowns = self.cooldowns.stats()
+        samples.append(("layconnector_cooldown_blocked_total", "counter", "Actions suppressed by a cooldown", {}, cooldowns["blocked"]))
+        ws = self.mod_ws_stats.stats()
+        samples.append(("layconnector_mod_ws_connected", "gauge", "Whether the DumbRequestManager WebSocket is connected", {}, int(ws["connected"])))
+        samples.append(("layconnector_mod_ws_reconnects_total", "counter", "DumbRequestManager WebSocket reconnects", {}, ws["reconnects"]))
+        breaker = self.mod_breaker
+        if breaker is not None:
+            stats = breaker.stats()
+            samples.append(("layconnector_mod_breaker_state", "gauge", "DumbRequestManager circuit breaker state (0 closed, 1 half-open, 2 open)",
+                            {}, (CLOSED, HALF_OPEN, OPEN).index(stats["state"])))
+            samples.append(("layconnector_mod_breaker_trips_total", "counter", "Times the DumbRequestManager circuit breaker opened", {}, stats["trips"]))
+            samples.append(("layconnector_mod_breaker_rejected_total", "counter", "DumbRequestManager requests skipped while the breaker was open", {}, stats["rejected"]))
+        client = self.mod_client
+        if client is not None and client.cache is not None:
+            cache = client.cache.stats()
+            for result in ("hits", "misses", "coalesced"):
+                samples.append(("layconnector_mod_cache_requests_total", "counter", "DumbRequestManager cache lookups", {"result": result}, cache[result]))
+        return samples
+
+    def outbound_stats(self):
+        outboxes = list(self.outboxes.values())
+        if not outboxes:
+            return None
+        totals = {}
+        for outbox in outboxes:
+            for key, value in outbox.stats().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    async def connect_mod_websocket(self):
+        import websockets
+        
+        mod_settings = self.cfg["mod_settings"]
+        ws_url = mod_settings["websocket_url"]
+        backoff = Backoff.from_settings(mod_settings.get("reconnect", {}))
+        ping_interval = mod_settings.get("ping_interval", DEFAULT_PING_INTERVAL)
+        ping_timeout = mod_settings.get("ping_timeout", DEFAULT_PING_TIMEOUT)
+        self.log_message(f"Connecting to DumbRequestManager WebSocket at {ws_url}", "mod")
+        
+        while True:
+            try:
+                async with websockets.connect(ws_url, ping_interval=ping_interval, ping_timeout=ping_timeout) as websocket:
+                    self.mod_ws = websocket
+                    self.mod_ws_stats.on_connect()
+                    if self.mod_breaker is not None:
+                        self.mod_breaker.probe_now()
+                    backoff.reset()
+                    if self.queue_mirror is not None:
+                        self.queue_mirror.set_live(True)
+                    self.log_message("Connected to DumbRequestManager WebSocket API", "mod")
+                    self.set_status("mod", "Connected", "green")
+                    
+                    async for message in websocket:
+                        try:
+                            await self.handle_mod_event(json.loads(message))
+                        except Exception as e:
+                            self.log_message(f"Error processing WebSocket message: {str(e)}", "error")
+                self.log_message("WebSocket connection closed", "mod")
+            except websockets.ConnectionClosed as e:
+                self.log_message(f"WebSocket connection lost: {str(e)}", "mod")
+            except Exception as e:
+                self.mod_ws_stats.on_failed_attempt()
+                self.log_message(f"WebSocket connection failed: {str(e)}", "error")
+            finally:
+                if self.mod_ws is not None:
+                    self.mod_ws = None
+                    self.mod_ws_stats.on_disconnect()
+                    if self.queue_mirror is not None:
+                        self.queue_mirror.set_live(False)
+            
+            await self.check_mod_http()
+            delay = backoff.next_delay()
+            self.log_message(f"Reconnecting to DumbRequestManager in {delay:.1f} seconds...", "mod")
+            self.set_status("mod", "Reconnecting...", "orange")
+            await asyncio.sleep(delay)
+            
+    async def handle_mod_event(self, event_data):
+        event_type = event_data.get("EventType")
+        timestamp = event_data.get("Timestamp")
+        data = event_data.get("Data")
+        
+        self.log_message(f"Received mod event: {event_type}", "mod")
+        
+        if self.mod_client is not None:
+            if event_type == "pressedPlay":
+                self.mod_client.invalidate("history", *QUEUE_ENDPOINTS)
+            else:
+                self.mod_client.invalidate(*QUEUE_ENDPOINTS)
+        if self.queue_mirror is not None:
+            self.queue_mirror.apply_event(event_type, data)
+        
+        if event_type == "pressedPlay":
+            if isinstance(data, dict) and "Title" in data and "Mapper" in data:
+                self.log_message(f"Now playing: {data['Title']} by {data['Mapper']}", "mod")
+        
+        elif event_type == "queueOpen":
+            state = "opened" if data else "closed"
+            self.log_message(f"Song request queue was {state}", "mod")
+            
+    def queue_changed(self):
+        if self.mod_client is not None:
+            self.mod_client.invalidate(*QUEUE_ENDPOINTS)
+        if self.queue_mirror is not None:
+            self.queue_mirror.request_resync()
+
+    async def lookup_queue(self, client, endpoint, path, params=None, user=None, limit=None):
+        if self.queue_mirror is not None:
+            data = self.queue_mirror.lookup(endpoint, user=user, limit=limit)
+            if data is not None:
+                return 200, data
+        return await client.get(path, params=params, endpoint=endpoint)
+
+    async def execute_mod_action(self, action_type, processed_params, user_input, username, channels):
+        if not self.cfg.get("mod_enabled", False) or self.mod_client is None:
+            return
+        with self.metrics.timer("layconnector_mod_action_seconds", "DumbRequestManager action time", type=action_type):
+            return await self.run_mod_action(action_type, processed_params, user_input, username, channels)
+
+    async def run_mod_action(self, action_type, processed_params, user_input, username, channels):            
+        try:
+            response_text = None
+            client = self.mod_client
+            
+            if action_type == "query":
+                map_key = processed_params.get("map_key", user_input)
+                if map_key:
+                    status, data = await client.get(f"/query/{map_key}", endpoint="query")
+                    if status == 200:
+                        if isinstance(data, dict) and "Title" in data and "Mapper" in data:
+                            response_text = f"Map found: {data['Title']} by {data['Mapper']}"
+                    else:
+                        response_text = "Map not found or error occurred."
+                                
+            elif action_type == "addKey":
+                map_key = processed_params.get("map_key", user_input)
+                user = processed_params.get("user", username)
+                prepend = processed_params.get("prepend", False)
+                
+                if map_key:
+                    query = {"user": user}
+                    if prepend:
+                        query["prepend"] = "true"
+                        
+                    status, data = await client.get(f"/addKey/{map_key}", params=query)
+                    if status == 200:
+                        self.queue_changed()
+                        if isinstance(data, dict) and "Title" in data:
+                            response_text = f"Added to queue: {data['Title']}"
+                        else:
+                            response_text = "Song added to queue."
+                    else:
+                        response_text = "Failed to add song to queue."
+                                
+            elif action_type == "queue":
+                status, data = await self.lookup_queue(client, "queue", "/queue")
+                if status == 200:
+                    if isinstance(data, list):
+                        if len(data) == 0:
+                            response_text = "The queue is currently empty."
+                        else:
+                            response_text = f"Queue has {len(data)} songs."
+                else:
+                    response_text = "Failed to get queue information."
+                            
+            elif action_type == "where":
+                user = processed_params.get("user", username)
+                status, data = await self.lookup_queue(client, "where", f"/queue/where/{user}", user=user)
+                if status == 200:
+                    if isinstance(data, list) and len(data) > 0:
+                        response_text = f"{user} has {len(data)} songs in queue. Next position: {data[0].get('Spot')}"
+                    else:
+                        response_text = f"{user} has no songs in queue."
+                else:
+                    response_text = "Failed to check queue position."
+                            
+            elif action_type == "clear":
+                status, _ = await client.get("/queue/clear")
+                if status == 200:
+                    self.queue_changed()
+                    response_text = "Queue has been cleared."
+                else:
+                    response_text = "Failed to clear the queue."
+                            
+            elif action_type == "open":
+                open_value = processed_params.get("open", True)
+                state = "true" if open_value else "false"
+                status, _ = await client.get(f"/queue/open/{state}")
+                if status == 200:
+                    response_text = f"Queue is now {'open' if open_value else 'closed'}."
+                else:
+                    response_text = "Failed to change queue status."
+                            
+            elif action_type == "move":
+                from_pos = processed_params.get("from", 1)
+                to_pos = processed_params.get("to", 1)
+                status, _ = await client.get(f"/queue/move/{from_pos}/{to_pos}")
+                if status == 200:
+                    self.queue_changed()
+                    response_text = f"Moved queue entry from position {from_pos} to {to_pos}."
+                else:
+                    response_text = "Failed to move queue entry."
+                            
+            elif action_type == "shuffle":
+                status, _ = await client.get("/queue/shuffle")
+                if status == 200:
+                    self.queue_changed()
+                    response_text = "Queue has been shuffled."
+                else:
+                    response_text = "Failed to shuffle the queue."
+                            
+            elif action_type == "history":
+                limit = processed_params.get("limit", 5)
+                status, data = await self.lookup_queue(client, "history", "/history", params={"limit": limit}, limit=int(limit))
+                if status == 200:
+                    if isinstance(data, list) and len(data) > 0:
+                        response_text = f"Last played: {data[0].get('HistoryItem', {}).get('Title', 'Unknown')}"
+                    else:
+                        response_text = "No play history available."
+                else:
+                    response_text = "Failed to get play history."
+            
+            if response_text:
+                self.reply(channels, response_text)
+                self.log_message(f"Mod action response: {response_text}", "mod")
+            return response_text
+                
+        except CircuitOpenError as e:
+            self.log_message(f"Skipped {action_type}: {str(e)}", "mod")
+            offline_message = self.cfg["mod_settings"].get("breaker", {}).get("offline_message")
+            if offline_message:
+                self.reply(channels, offline_message)
+            return "Skipped: DumbRequestManager unavailable"
+        except Exception as e:
+            self.log_message(f"Error executing mod action: {str(e)}", "error")
+            self.reply(channels, f"Error executing DumbRequestManager action: {str(e)}")
+            return f"Error: {str(e)}"
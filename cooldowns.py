@@ -0,0 +1,133 @@
+import collections
+import time
+
+DEFAULT_MAX_TRACKED_USERS = 50000
+DEFAULT_BURST_WINDOW = 60
+
+
+class TTLCache:
+    def __init__(self, max_entries, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, now=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if now is None:
+            now = self.clock()
+        if entry[0] <= now:
+            del self.entries[key]
+            return None
+        return entry[1]
+
+    def set(self, key, value, ttl, now=None):
+        if now is None:
+            now = self.clock()
+        entries = self.entries
+        entries[key] = (now + ttl, value)
+        entries.move_to_end(key)
+
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        for _ in range(2):
+            if not entries:
+                break
+            oldest = next(iter(entries.values()))
+            if oldest[0] > now:
+                break
+            entries.popitem(last=False)
+
+
+class Cooldown:
+    __slots__ = ("global_seconds", "user_seconds", "burst", "burst_window")
+
+    def __init__(self, global_seconds=0, user_seconds=0, burst=0, burst_window=DEFAULT_BURST_WINDOW):
+        self.global_seconds = global_seconds
+        self.user_seconds = user_seconds
+        self.burst = burst
+        self.burst_window = burst_window
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings:
+            return None
+        cooldown = cls(
+            global_seconds=float(settings.get("global", 0)),
+            user_seconds=float(settings.get("user", 0)),
+            burst=int(settings.get("burst", 0)),
+            burst_window=float(settings.get("burst_window", DEFAULT_BURST_WINDOW)),
+        )
+        if not cooldown.global_seconds and not cooldown.user_seconds and not cooldown.burst:
+            return None
+        return cooldown
+
+
+class _UserState:
+    __slots__ = ("next_allowed", "window_start", "count")
+
+    def __init__(self, now):
+        self.next_allowed = 0.0
+        self.window_start = now
+        self.count = 0
+
+
+class CooldownEngine:
+    def __init__(self, max_tracked_users=DEFAULT_MAX_TRACKED_USERS, clock=time.monotonic):
+        self.clock = clock
+        self.global_until = {}
+        self.users = TTLCache(max_tracked_users, clock)
+        self.allowed = 0
+        self.blocked = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(max_tracked_users=settings.get("max_tracked_users", DEFAULT_MAX_TRACKED_USERS))
+
+    def allow(self, key, cooldown, user):
+        if cooldown is None:
+            return True
+
+        now = self.clock()
+        if self.global_until.get(key, 0.0) > now:
+            self.blocked += 1
+            return False
+
+        state = None
+        if cooldown.user_seconds or cooldown.burst:
+            state = self.users.get((key, user), now)
+            if state is not None:
+                if state.next_allowed > now:
+                    self.blocked += 1
+                    return False
+                if cooldown.burst:
+                    if now - state.window_start >= cooldown.burst_window:
+                        state.window_start = now
+                        state.count = 0
+                    elif state.count >= cooldown.burst:
+                        self.blocked += 1
+                        return False
+            else:
+                state = _UserState(now)
+
+        if cooldown.global_seconds:
+            self.global_until[key] = now + cooldown.global_seconds
+        if state is not None:
+            state.next_allowed = now + cooldown.user_seconds
+            state.count += 1
+            ttl = max(cooldown.user_seconds, cooldown.burst_window if cooldown.burst else 0)
+            self.users.set((key, user), state, ttl, now)
+
+        self.allowed += 1
+        return True
+
+    def stats(self):
+        return {
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "tracked_users": len(self.users),
+        }
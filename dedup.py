@@ -0,0 +1,112 @@
+import asyncio
+import collections
+import time
+
+DEFAULT_WINDOW = 5.0
+DEFAULT_THRESHOLD = 1
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_FORMAT = "{username}: {text} (x{count})"
+
+
+def fingerprint(source, text):
+    return hash((source, " ".join(text.casefold().split())))
+
+
+class _Entry:
+    __slots__ = ("source", "text", "username", "seen", "collapsed", "deadline")
+
+    def __init__(self, source, text, username, deadline):
+        self.source = source
+        self.text = text
+        self.username = username
+        self.seen = 1
+        self.collapsed = 0
+        self.deadline = deadline
+
+
+class SpamCollapser:
+    def __init__(self, emit, window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD,
+                 max_entries=DEFAULT_MAX_ENTRIES, summary_format=DEFAULT_FORMAT, clock=time.monotonic):
+        self.emit = emit
+        self.window = window
+        self.threshold = max(1, threshold)
+        self.max_entries = max_entries
+        self.summary_format = summary_format
+        self.clock = clock
+        self.entries = collections.OrderedDict()
+
+        self.passed = 0
+        self.collapsed = 0
+        self.summaries = 0
+
+    @classmethod
+    def from_settings(cls, settings, emit):
+        return cls(
+            emit,
+            window=float(settings.get("window", DEFAULT_WINDOW)),
+            threshold=int(settings.get("threshold", DEFAULT_THRESHOLD)),
+            max_entries=int(settings.get("max_entries", DEFAULT_MAX_ENTRIES)),
+            summary_format=settings.get("format", DEFAULT_FORMAT),
+        )
+
+    def offer(self, source, username, text):
+        now = self.clock()
+        key = fingerprint(source, text)
+        entry = self.entries.get(key)
+        if entry is not None and entry.deadline <= now:
+            entry = self._expire(key, entry, now)
+
+        if entry is None:
+            self.entries[key] = _Entry(source, text, username, now + self.window)
+            while len(self.entries) > self.max_entries:
+                self._expire(*self.entries.popitem(last=False), None)
+            self.passed += 1
+            return True
+
+        entry.seen += 1
+        if entry.seen <= self.threshold:
+            self.passed += 1
+            return True
+        entry.collapsed += 1
+        entry.username = username
+        self.collapsed += 1
+        return False
+
+    def _expire(self, key, entry, now):
+        if not entry.collapsed:
+            self.entries.pop(key, None)
+            return None
+
+        self.summaries += 1
+        self.emit(entry.source, self.summary_format.format(
+            username=entry.username, text=entry.text, count=entry.collapsed
+        ))
+        if now is None:
+            return None
+        # the train is still running: keep swallowing it for another window instead of letting one copy through
+        entry.collapsed = 0
+        entry.deadline = now + self.window
+        self.entries.move_to_end(key)
+        return entry
+
+    def sweep(self):
+        now = self.clock()
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if entry.deadline > now:
+                break
+            self._expire(key, entry, now)
+
+    async def run(self):
+        interval = max(self.window / 4, 0.1)
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def stats(self):
+        return {
+            "tracked": len(self.entries),
+            "passed": self.passed,
+            "collapsed": self.collapsed,
+            "summaries": self.summaries,
+        }
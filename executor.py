@@ -0,0 +1,108 @@
+import asyncio
+import functools
+
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 15.0
+
+
+class ActionExecutor:
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, log=None):
+        self.max_in_flight = max_in_flight
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.log = log
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.limits = {}
+        self.chains = {}
+        self.tasks = set()
+
+        self.started = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    @classmethod
+    def from_settings(cls, settings, log=None):
+        return cls(
+            max_in_flight=settings.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT),
+            concurrency=settings.get("concurrency", DEFAULT_CONCURRENCY),
+            timeout=settings.get("timeout", DEFAULT_TIMEOUT),
+            log=log,
+        )
+
+    def _limit(self, key, concurrency):
+        # keyed by the size too, so a live edit of an action's concurrency takes effect for new calls
+        limit = self.limits.get((key, concurrency))
+        if limit is None:
+            limit = self.limits[(key, concurrency)] = asyncio.Semaphore(concurrency)
+        return limit
+
+    def _unchain(self, key, task):
+        if self.chains.get(key) is task:
+            del self.chains[key]
+
+    async def submit(self, key, call, concurrency=None, timeout=None, ordered=False, on_done=None):
+        # waiting here for a free slot is what pushes back on the dispatch stage
+        await self.slots.acquire()
+        if ordered:
+            limit = None
+            previous = self.chains.get(key)
+        else:
+            limit = self._limit(key, concurrency or self.concurrency)
+            previous = None
+        task = asyncio.ensure_future(self._run(key, call, limit, previous, timeout or self.timeout, on_done))
+        if ordered:
+            self.chains[key] = task
+            task.add_done_callback(functools.partial(self._unchain, key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        self.started += 1
+
+    async def _run(self, key, call, limit, previous, timeout, on_done):
+        result = None
+        try:
+            if previous is not None:
+                # ordered calls wait in their own task for the one submitted before them, not in submit
+                await asyncio.wait([previous])
+            if limit is None:
+                result = await asyncio.wait_for(call(), timeout)
+            else:
+                async with limit:
+                    result = await asyncio.wait_for(call(), timeout)
+            self.completed += 1
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            result = f"Timed out after {timeout:g} seconds"
+            if self.log:
+                self.log(f"Action {key[-1]} timed out after {timeout:g} seconds")
+        except Exception as e:
+            self.errors += 1
+            result = f"Error: {str(e)}"
+            if self.log:
+                self.log(f"Action {key[-1]} failed: {str(e)}")
+        finally:
+            self.slots.release()
+        if on_done is not None:
+            on_done(result)
+
+    async def run(self):
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for task in list(self.tasks):
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def in_flight(self):
+        return len(self.tasks)
+
+    def stats(self):
+        return {
+            "in_flight": len(self.tasks),
+            "started": self.started,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
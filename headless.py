@@ -0,0 +1,83 @@
+from startup import StartupTimer
+
+startup_timer = StartupTimer()
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+
+from config import CONFIG_FILE, ConfigError, ensure_config, is_configured
+from connector import Connector
+
+startup_timer.mark("import layconnector")
+
+logger = logging.getLogger("layconnector")
+
+
+def log_message(message, source="system"):
+    if source == "error":
+        logger.error(message)
+    else:
+        logger.info(f"[{source}] {message}")
+
+
+def log_status(target, status, color):
+    logger.info(f"[{target}] status: {status}")
+
+
+async def run(cfg, config_path=None):
+    connector = Connector(cfg, log=log_message, status=log_status, config_path=config_path)
+    task = asyncio.ensure_future(connector.run())
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, task.cancel)
+        except (NotImplementedError, AttributeError, ValueError):
+            signal.signal(signum, lambda *args: loop.call_soon_threadsafe(task.cancel))
+
+    logger.info("Starting connections...")
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    logger.info("Connector stopped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the LayConnector relay without the GUI.")
+    parser.add_argument("--config", default=CONFIG_FILE, help="path to config.json")
+    parser.add_argument("-v", "--verbose", action="store_true", help="enable debug logging")
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="print how long each startup phase took")
+    parser.add_argument("--startup-timing-file",
+                        help="append startup phase timings as a JSON line to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    try:
+        cfg = ensure_config(args.config)
+    except ConfigError as e:
+        logger.error(str(e))
+        return 2
+    startup_timer.mark("load config")
+    if args.startup_timing:
+        startup_timer.report()
+    if args.startup_timing_file:
+        startup_timer.write(args.startup_timing_file, "headless")
+    if not is_configured(cfg):
+        logger.error(f"{args.config} is missing tiktok_username, twitch_username or twitch_token")
+        return 2
+
+    asyncio.run(run(cfg, args.config))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
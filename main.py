@@ -1,51 +1,38 @@
+from startup import StartupTimer
+
+startup_timer = StartupTimer()
+
+import argparse
+import copy
 import os
-import json
+import re
+import sys
+import time
 import webbrowser
 import asyncio
 import threading
-import requests
-import websockets
-import aiohttp
-import time
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLineEdit, QLabel, QMessageBox,
     QListWidget, QDialog, QFormLayout, QDialogButtonBox,
     QInputDialog, QListWidgetItem, QTabWidget, QCheckBox,
-    QComboBox, QGroupBox, QScrollArea
+    QComboBox, QGroupBox, QScrollArea, QListView,
+    QSpinBox, QDoubleSpinBox, QTableWidget, QTableWidgetItem,
+    QHeaderView
 )
-from PySide6.QtCore import Qt, Signal, QObject
-
-from TikTokLive import TikTokLiveClient
-from TikTokLive.events import ConnectEvent, CommentEvent
-from twitchio.ext.commands import Bot
-
-CONFIG_DIR = os.path.join(os.getenv("APPDATA"), "layconnector")
-CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
-
-def ensure_config():
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    if not os.path.exists(CONFIG_FILE):
-        cfg = {
-            "tiktok_username": "",
-            "twitch_username": "",
-            "twitch_token": "",
-            "actions": [],
-            "mod_enabled": False,
-            "mod_settings": {
-                "http_url": "http://localhost:13337",
-                "websocket_url": "ws://localhost:13338"
-            }
-        }
-        with open(CONFIG_FILE, "w") as f:
-            json.dump(cfg, f, indent=4)
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+from PySide6.QtCore import Qt, Signal, QObject, QTimer
+
+startup_timer.mark("import PySide6")
 
-def save_config(cfg):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(cfg, f, indent=4)
+import archive
+from activitylog import ActivityLogModel, SourceFilterProxy, SOURCES, SOURCE_LABELS
+from config import CONFIG_FILE, ConfigError, ensure_config, save_config, default_config, is_configured
+from connector import Connector
+from qtbridge import ConnectorBridge
+from triggers import PATTERN, PREFIX, REGEX, compile_pattern
+
+startup_timer.mark("import layconnector")
 
 
 class SetupWizard(QWidget):
@@ -79,17 +66,10 @@ class SetupWizard(QWidget):
         if not tik or not tw or not tok:
             QMessageBox.warning(self, "Missing data", "Please fill all fields!")
             return
-        cfg = {
-            "tiktok_username": tik,
-            "twitch_username": tw,
-            "twitch_token": tok,
-            "actions": [],
-            "mod_enabled": False,
-            "mod_settings": {
-                "http_url": "http://localhost:13337",
-                "websocket_url": "ws://localhost:13338"
-            }
-        }
+        cfg = default_config()
+        cfg["tiktok_username"] = tik
+        cfg["twitch_username"] = tw
+        cfg["twitch_token"] = tok
         save_config(cfg)
         QMessageBox.information(self, "Saved", "Configuration saved!")
         self.close()
@@ -122,6 +102,15 @@ class ActionDialog(QDialog):
         form = QFormLayout()
         self.trigger_input = QLineEdit(self.action["trigger"])
         form.addRow("Trigger (e.g. !bsr abc):", self.trigger_input)
+        
+        self.trigger_type = QComboBox()
+        self.trigger_type.addItem("Starts with", PREFIX)
+        self.trigger_type.addItem("Pattern, e.g. !move {from:int} {to:int}", PATTERN)
+        self.trigger_type.addItem("Regular expression", REGEX)
+        self.trigger_type.setCurrentIndex(max(0, self.trigger_type.findData(self.action.get("trigger_type", PREFIX))))
+        form.addRow("Trigger type:", self.trigger_type)
+        form.addRow(QLabel("Pattern arguments are {name}, {name:int}, {name:hex} or {name:rest}. Arguments named\n"
+                           "map_key, user, from, to or limit fill the DumbRequestManager parameters of the same name."))
         layout.addLayout(form)
         
         tabs = QTabWidget()
@@ -146,7 +135,8 @@ class ActionDialog(QDialog):
         resp_btns.addWidget(delete_resp)
         std_layout.addLayout(resp_btns)
         
-        std_layout.addWidget(QLabel("Available variables: {userinput}, {username}"))
+        std_layout.addWidget(QLabel("Available variables: {userinput}, {username}, {arg1}, {arg2}, ...,\n"
+                                    "{random:a|b|c}, {counter}, {counter:name}, {time}, {date}"))
         tabs.addTab(standard_tab, "Standard Responses")
         
         mod_tab = QWidget()
@@ -196,6 +186,38 @@ class ActionDialog(QDialog):
         self.mod_group.setEnabled(self.action["use_mod"] and self.mod_enabled)
         
         tabs.addTab(mod_tab, "DumbRequestManager Integration")
+        
+        cooldown_tab = QWidget()
+        cooldown_layout = QFormLayout(cooldown_tab)
+        cooldown = self.action.get("cooldown", {})
+        
+        self.global_cooldown = QDoubleSpinBox()
+        self.global_cooldown.setRange(0, 86400)
+        self.global_cooldown.setSuffix(" s")
+        self.global_cooldown.setValue(cooldown.get("global", 0))
+        cooldown_layout.addRow("Global cooldown:", self.global_cooldown)
+        
+        self.user_cooldown = QDoubleSpinBox()
+        self.user_cooldown.setRange(0, 86400)
+        self.user_cooldown.setSuffix(" s")
+        self.user_cooldown.setValue(cooldown.get("user", 0))
+        cooldown_layout.addRow("Per-user cooldown:", self.user_cooldown)
+        
+        self.burst_count = QSpinBox()
+        self.burst_count.setRange(0, 1000)
+        self.burst_count.setSpecialValueText("Unlimited")
+        self.burst_count.setValue(cooldown.get("burst", 0))
+        cooldown_layout.addRow("Uses per user:", self.burst_count)
+        
+        self.burst_window = QDoubleSpinBox()
+        self.burst_window.setRange(1, 86400)
+        self.burst_window.setSuffix(" s")
+        self.burst_window.setValue(cooldown.get("burst_window", 60))
+        cooldown_layout.addRow("...within:", self.burst_window)
+        
+        cooldown_layout.addRow(QLabel("Set a value to 0 to disable that limit."))
+        tabs.addTab(cooldown_tab, "Cooldowns")
+        
         layout.addWidget(tabs)
         
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
@@ -321,10 +343,29 @@ class ActionDialog(QDialog):
                              "Please provide a trigger and either responses or enable mod action.")
             return
         
+        trigger_type = self.trigger_type.currentData()
+        if trigger_type != PREFIX:
+            try:
+                compile_pattern(trigger, trigger_type)
+            except (ValueError, re.error) as e:
+                QMessageBox.warning(self, "Invalid Trigger", f"The trigger is not a valid {trigger_type}:\n\n{str(e)}")
+                return
+        
         self.action["trigger"] = trigger
+        if trigger_type == PREFIX:
+            self.action.pop("trigger_type", None)
+        else:
+            self.action["trigger_type"] = trigger_type
         self.action["responses"] = responses
         self.action["use_mod"] = self.mod_checkbox.isChecked() and self.mod_enabled
         
+        self.action["cooldown"] = {
+            "global": self.global_cooldown.value(),
+            "user": self.user_cooldown.value(),
+            "burst": self.burst_count.value(),
+            "burst_window": self.burst_window.value()
+        }
+        
         if self.action["use_mod"]:
             action_type, params = self.gather_params()
             self.action["mod_action"] = {
@@ -485,6 +526,7 @@ class SettingsWindow(QWidget):
         http_url = self.http_url.text().strip()
         
         try:
+            import requests
             response = requests.get(f"{http_url}/queue", timeout=3)
             if response.status_code == 200:
                 QMessageBox.information(self, "Connection Success", 
@@ -499,10 +541,11 @@ class SettingsWindow(QWidget):
     
     def on_save(self):
         self.cfg["mod_enabled"] = self.mod_enabled_check.isChecked()
-        self.cfg["mod_settings"] = {
-            "http_url": self.http_url.text().strip(),
-            "websocket_url": self.websocket_url.text().strip()
-        }
+        self.cfg["mod_settings"] = dict(
+            self.cfg.get("mod_settings", {}),
+            http_url=self.http_url.text().strip(),
+            websocket_url=self.websocket_url.text().strip()
+        )
         
         if not self.cfg["mod_enabled"]:
             for act in self.cfg["actions"]:
@@ -514,13 +557,95 @@ class SettingsWindow(QWidget):
         self.close()
 
 
+class ArchiveDialog(QDialog):
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Comment Archive")
+        self.path = path
+        self.connection = None
+        layout = QVBoxLayout(self)
+        
+        form = QFormLayout()
+        self.user_input = QLineEdit()
+        form.addRow("User:", self.user_input)
+        self.trigger_input = QLineEdit()
+        self.trigger_input.setPlaceholderText("e.g. !bsr")
+        form.addRow("Trigger:", self.trigger_input)
+        self.text_input = QLineEdit()
+        form.addRow("Text:", self.text_input)
+        self.limit_input = QSpinBox()
+        self.limit_input.setRange(1, 10000)
+        self.limit_input.setValue(archive.DEFAULT_SEARCH_LIMIT)
+        form.addRow("Limit:", self.limit_input)
+        layout.addLayout(form)
+        
+        search_btn = QPushButton("Search")
+        search_btn.setDefault(True)
+        search_btn.clicked.connect(self.run_search)
+        layout.addWidget(search_btn)
+        
+        self.results = QTableWidget(0, 5)
+        self.results.setHorizontalHeaderLabels(["Time", "Stream", "User", "Comment", "Result"])
+        self.results.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.results.verticalHeader().setVisible(False)
+        self.results.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.results)
+        
+        self.summary = QLabel("")
+        layout.addWidget(self.summary)
+        self.resize(800, 500)
+
+    def run_search(self):
+        try:
+            if self.connection is None:
+                self.connection = archive.connect(self.path, readonly=True)
+            started = time.perf_counter()
+            rows = archive.search(
+                self.connection,
+                user=self.user_input.text().strip(),
+                trigger=self.trigger_input.text().strip(),
+                text=self.text_input.text().strip(),
+                limit=self.limit_input.value()
+            )
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            QMessageBox.warning(self, "Archive", f"Could not search {self.path}:\n\n{str(e)}")
+            return
+        
+        self.results.setRowCount(len(rows))
+        for row, entry in enumerate(rows):
+            cells = [
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["ts"])),
+                entry["source"],
+                entry["username"],
+                entry["comment"],
+                entry["mod_result"] or "",
+            ]
+            for column, text in enumerate(cells):
+                self.results.setItem(row, column, QTableWidgetItem(text))
+        self.summary.setText(f"{len(rows)} comments in {elapsed * 1000:.1f} ms")
+
+    def done(self, result):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        super().done(result)
+
+
 class MainWindow(QWidget):
-    def __init__(self):
+    def __init__(self, cfg=None):
         super().__init__()
         self.setWindowTitle("LayConnector Dashboard")
-        self.cfg = ensure_config()
+        self.cfg = cfg if cfg is not None else ensure_config()
         self.running = False
-        self.mod_ws = None
+        self.connector = None
+        self.loop = None
+        self.connector_task = None
+        
+        self.bridge = ConnectorBridge(self)
+        self.bridge.on("status", self.apply_status)
+        self.bridge.on("stopped", self.on_connector_stopped)
+        self.bridge.on("config", self.on_config_reloaded)
         
         layout = QVBoxLayout(self)
         
@@ -539,8 +664,29 @@ class MainWindow(QWidget):
         self.mod_status.setStyleSheet("color: gray;")
         status_layout.addRow("DumbRequestManager:", self.mod_status)
         
+        self.pipeline_status = QLabel("Idle")
+        status_layout.addRow("Relay Pipeline:", self.pipeline_status)
+        
+        self.outbound_status = QLabel("Idle")
+        status_layout.addRow("Twitch Outbox:", self.outbound_status)
+        
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_relay_status)
+        self.stats_timer.start(1000)
+        
         layout.addWidget(status_group)
         
+        latency_group = QGroupBox("Latency")
+        latency_layout = QVBoxLayout(latency_group)
+        self.latency_table = QTableWidget(0, 5)
+        self.latency_table.setHorizontalHeaderLabels(["Measurement", "Count", "p50", "p99", "Max"])
+        self.latency_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.latency_table.verticalHeader().setVisible(False)
+        self.latency_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.latency_table.setMaximumHeight(160)
+        latency_layout.addWidget(self.latency_table)
+        layout.addWidget(latency_group)
+        
         config_group = QGroupBox("Configuration Summary")
         config_layout = QFormLayout(config_group)
         
@@ -575,6 +721,10 @@ class MainWindow(QWidget):
         settings_btn.clicked.connect(self.open_settings)
         layout.addWidget(settings_btn)
         
+        archive_btn = QPushButton("Search Archive")
+        archive_btn.clicked.connect(self.open_archive)
+        layout.addWidget(archive_btn)
+        
         exit_btn = QPushButton("Exit")
         exit_btn.clicked.connect(QApplication.instance().quit)
         layout.addWidget(exit_btn)
@@ -582,337 +732,217 @@ class MainWindow(QWidget):
         log_group = QGroupBox("Activity Log")
         log_layout = QVBoxLayout(log_group)
         
-        self.log_widget = QListWidget()
-        log_layout.addWidget(self.log_widget)
+        self.log_filter = QComboBox()
+        self.log_filter.addItem("All", None)
+        for source in SOURCES:
+            self.log_filter.addItem(SOURCE_LABELS[source], source)
+        self.log_filter.currentIndexChanged.connect(self.on_log_filter_changed)
+        log_layout.addWidget(self.log_filter)
+        
+        self.log_model = ActivityLogModel.from_settings(self.cfg.get("activity_log", {}), self)
+        self.log_proxy = SourceFilterProxy(self)
+        self.log_proxy.setSourceModel(self.log_model)
+        self.log_model.rowsInserted.connect(lambda *args: self.log_view.scrollToBottom())
+        
+        self.log_view = QListView()
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setModel(self.log_proxy)
+        log_layout.addWidget(self.log_view)
         
         layout.addWidget(log_group)
         
         self.resize(500, 600)
         
-    def log_message(self, message):
-        self.log_widget.addItem(time.strftime("%H:%M:%S") + " - " + message)
-        self.log_widget.scrollToBottom()
+    def log_message(self, message, source="system"):
+        self.log_model.append(source, message)
+
+    def set_status(self, target, status, color):
+        self.bridge.post("status", target, status, color)
+
+    def on_log_filter_changed(self, index):
+        self.log_proxy.set_source(self.log_filter.itemData(index))
+
+    def apply_status(self, target, status, color):
+        label = {
+            "tiktok": self.tiktok_status,
+            "twitch": self.twitch_status,
+            "mod": self.mod_status,
+        }[target]
+        label.setText(status)
+        label.setStyleSheet(f"color: {color};")
 
     def open_settings(self):
         self.settings = SettingsWindow(self.cfg, self.on_settings_updated)
         self.settings.show()
 
+    def open_archive(self):
+        path = self.cfg.get("archive", {}).get("path", archive.DEFAULT_PATH)
+        if not os.path.exists(path):
+            QMessageBox.information(self, "Archive", f"No comments have been archived yet.\n\nEnable \"archive\" in {CONFIG_FILE} to start.")
+            return
+        dialog = ArchiveDialog(path, self)
+        dialog.exec()
+
     def on_settings_updated(self, new_cfg):
+        self.on_config_reloaded(new_cfg)
+        
+        if self.connector is not None:
+            self.connector.apply_config(copy.deepcopy(self.cfg))
+
+    def on_config_reloaded(self, new_cfg):
         self.cfg = new_cfg
         
         self.tiktok_user.setText(self.cfg["tiktok_username"] or "Not configured")
         self.twitch_user.setText(self.cfg["twitch_username"] or "Not configured")
         self.actions_count.setText(f"{len(self.cfg['actions'])} actions configured")
         self.mod_enabled.setText("Enabled" if self.cfg.get("mod_enabled", False) else "Disabled")
-        
-        if self.running:
-            QMessageBox.information(self, "Settings Changed", 
-                                  "Please restart the connector to apply new settings.")
 
     def start_connectors(self):
+        try:
+            connector = Connector(
+                copy.deepcopy(self.cfg),
+                log=self.log_message,
+                status=self.set_status,
+                config_path=CONFIG_FILE,
+                on_config=lambda cfg: self.bridge.post("config", copy.deepcopy(cfg))
+            )
+        except (ValueError, re.error) as e:
+            QMessageBox.warning(self, "Invalid Configuration", f"Could not compile the actions:\n\n{str(e)}")
+            return
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.running = True
+        self.connector = connector
         
-        self.thread = threading.Thread(target=lambda: asyncio.run(self.run_async()), daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self.connector_task = self.loop.create_task(self.connector.run())
+        self.thread = threading.Thread(target=self.run_loop, args=(self.loop, self.connector_task), daemon=True)
         self.thread.start()
         
         self.log_message("Starting connections...")
 
     def stop_connectors(self):
+        if not self.running:
+            return
         self.log_message("Stopping connections...")
         self.running = False
+        self.stop_btn.setEnabled(False)
+        
+        task = self.connector_task
+        if task is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(task.cancel)
+
+    def on_connector_stopped(self):
+        self.running = False
+        self.connector = None
+        self.connector_task = None
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         
-        self.tiktok_status.setText("Disconnected")
-        self.tiktok_status.setStyleSheet("color: red;")
-        self.twitch_status.setText("Disconnected")
-        self.twitch_status.setStyleSheet("color: red;")
-        self.mod_status.setText("Disabled")
-        self.mod_status.setStyleSheet("color: gray;")
+        self.apply_status("tiktok", "Disconnected", "red")
+        self.apply_status("twitch", "Disconnected", "red")
+        self.apply_status("mod", "Disabled", "gray")
 
-    async def run_async(self):
+    def run_loop(self, loop, task):
+        asyncio.set_event_loop(loop)
         try:
-            def update_ui(func):
-                QApplication.instance().callAfter(func)
-                
-            tik = TikTokLiveClient(unique_id=self.cfg["tiktok_username"])
-            
-            bot = Bot(
-                token=self.cfg["twitch_token"],
-                prefix="!",
-                initial_channels=[self.cfg["twitch_username"]]
-            )
-            
-            mod_connected = False
-            
-            if self.cfg.get("mod_enabled", False):
-                self.mod_ws = None
-                try:
-                    self.log_message("Testing DumbRequestManager HTTP connection...")
-                    response = await aiohttp.ClientSession().get(
-                        f"{self.cfg['mod_settings']['http_url']}/queue", 
-                        timeout=aiohttp.ClientTimeout(total=3)
-                    )
-                    if response.status == 200:
-                        self.log_message("DumbRequestManager HTTP connection successful")
-                        mod_connected = True
-                        
-                        QApplication.instance().callAfter(lambda: self.update_mod_status("HTTP Connected", "green"))
-                    else:
-                        self.log_message(f"DumbRequestManager HTTP connection failed: Status {response.status}")
-                        QApplication.instance().callAfter(lambda: self.update_mod_status("HTTP Error", "orange"))
-                except Exception as e:
-                    self.log_message(f"DumbRequestManager HTTP connection failed: {str(e)}")
-                    QApplication.instance().callAfter(lambda: self.update_mod_status("Connection Error", "red"))
-            
-            @tik.on(ConnectEvent)
-            async def on_tik_connect(evt):
-                self.log_message(f"Connected to TikTok @{evt.unique_id}")
-                QApplication.instance().callAfter(lambda: self.update_tiktok_status("Connected", "green"))
-
-            @tik.on(CommentEvent)
-            async def on_comment(evt):
-                msg = f"{evt.user.nickname}: {evt.comment}"
-                username = evt.user.nickname
-                comment = evt.comment
-                
-                channel = bot.get_channel(self.cfg["twitch_username"])
-                if channel:
-                    await channel.send(msg)
-                
-                for act in self.cfg["actions"]:
-                    if comment.startswith(act["trigger"]):
-                        user_input = comment[len(act["trigger"]):].strip()
-                        
-                        for cmd in act["responses"]:
-                            out = cmd.replace("{userinput}", user_input).replace("{username}", username)
-                            if channel:
-                                await channel.send(out)
-                        
-                        if act.get("use_mod", False) and mod_connected and self.cfg.get("mod_enabled", False):
-                            await self.execute_mod_action(act["mod_action"], user_input, username, channel)
-
-            tasks = [tik.start(), bot.start()]
-            
-            if self.cfg.get("mod_enabled", False):
-                tasks.append(self.connect_mod_websocket())
-                
-            await asyncio.gather(*tasks)
-            
-        except Exception as e:
-            self.log_message(f"Error in connector: {str(e)}")
-            QApplication.instance().callAfter(lambda: self.stop_connectors())
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+            self.bridge.post("stopped")
 
-    def update_tiktok_status(self, status, color):
-        self.tiktok_status.setText(status)
-        self.tiktok_status.setStyleSheet(f"color: {color};")
-        
-    def update_twitch_status(self, status, color):
-        self.twitch_status.setText(status)
-        self.twitch_status.setStyleSheet(f"color: {color};")
-        
-    def update_mod_status(self, status, color):
-        self.mod_status.setText(status)
-        self.mod_status.setStyleSheet(f"color: {color};")
-        
-    async def connect_mod_websocket(self):
-        try:
-            ws_url = self.cfg["mod_settings"]["websocket_url"]
-            self.log_message(f"Connecting to DumbRequestManager WebSocket at {ws_url}")
-            
-            while self.running:
-                try:
-                    async with websockets.connect(ws_url) as websocket:
-                        self.mod_ws = websocket
-                        self.log_message("Connected to DumbRequestManager WebSocket API")
-                        QApplication.instance().callAfter(lambda: self.update_mod_status("Connected", "green"))
-                        
-                        while self.running:
-                            try:
-                                message = await asyncio.wait_for(websocket.recv(), timeout=1.0)
-                                event_data = json.loads(message)
-                                await self.handle_mod_event(event_data)
-                            except asyncio.TimeoutError:
-                                continue
-                            except websockets.ConnectionClosed:
-                                self.log_message("WebSocket connection closed")
-                                break
-                            except Exception as e:
-                                self.log_message(f"Error processing WebSocket message: {str(e)}")
-                                
-                        self.mod_ws = None
-                        if not self.running:
-                            break
-                except (ConnectionRefusedError, OSError) as e:
-                    if not self.running:
-                        break
-                    self.log_message(f"WebSocket connection failed: {str(e)}. Retrying in 5 seconds...")
-                    QApplication.instance().callAfter(lambda: self.update_mod_status("Reconnecting...", "orange"))
-                    await asyncio.sleep(5)
-                
-        except Exception as e:
-            self.log_message(f"WebSocket error: {str(e)}")
-            QApplication.instance().callAfter(lambda: self.update_mod_status("Error", "red"))
-            
-    async def handle_mod_event(self, event_data):
-        event_type = event_data.get("EventType")
-        timestamp = event_data.get("Timestamp")
-        data = event_data.get("Data")
-        
-        self.log_message(f"Received mod event: {event_type}")
-        
-        if event_type == "pressedPlay":
-            if isinstance(data, dict) and "Title" in data and "Mapper" in data:
-                self.log_message(f"Now playing: {data['Title']} by {data['Mapper']}")
+    def update_relay_status(self):
+        pipeline = self.connector.pipeline if self.connector else None
+        stats = self.connector.outbound_stats() if self.connector else None
+        
+        if self.connector is not None:
+            self.update_latency_table(self.connector.metrics.snapshot())
+            ws = self.connector.mod_ws_stats.stats()
+            tooltip = f"{ws['reconnects']} reconnects, {ws['failed_attempts']} failed attempts"
+            if ws["last_reconnect_seconds"] is not None:
+                tooltip += f"\nLast reconnect took {ws['last_reconnect_seconds']:.1f}s (max {ws['max_reconnect_seconds']:.1f}s)"
+            breaker = self.connector.mod_breaker
+            if breaker is not None:
+                breaker_stats = breaker.stats()
+                tooltip += f"\nCircuit breaker {breaker_stats['state'].replace('_', '-')}, opened {breaker_stats['trips']} times, {breaker_stats['rejected']} requests skipped"
+                if breaker_stats["state"] == "open":
+                    self.apply_status("mod", f"Unavailable, retrying in {breaker_stats['retry_in']:.0f}s", "red")
+            self.mod_status.setToolTip(tooltip)
+        
+        if pipeline is not None:
+            self.pipeline_status.setText(
+                f"{pipeline.depth()} queued, {pipeline.dropped()} dropped"
+            )
+        else:
+            self.pipeline_status.setText("Idle")
         
-        elif event_type == "queueOpen":
-            state = "opened" if data else "closed"
-            self.log_message(f"Song request queue was {state}")
-            
-    async def execute_mod_action(self, mod_action, user_input, username, twitch_channel):
-        if not self.cfg.get("mod_enabled", False):
+        if stats is None:
+            self.outbound_status.setText("Idle")
             return
-            
-        action_type = mod_action.get("type", "query")
-        params = mod_action.get("params", {})
-        http_url = self.cfg["mod_settings"]["http_url"]
-        
-        try:
-            processed_params = {}
-            for key, value in params.items():
-                if isinstance(value, str):
-                    processed_params[key] = value.replace("{userinput}", user_input).replace("{username}", username)
-                else:
-                    processed_params[key] = value
-            
-            response_text = None
-            
-            if action_type == "query":
-                map_key = processed_params.get("map_key", user_input)
-                if map_key:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(f"{http_url}/query/{map_key}") as response:
-                            if response.status == 200:
-                                data = await response.json()
-                                if "Title" in data and "Mapper" in data:
-                                    response_text = f"Map found: {data['Title']} by {data['Mapper']}"
-                            else:
-                                response_text = "Map not found or error occurred."
-                                
-            elif action_type == "addKey":
-                map_key = processed_params.get("map_key", user_input)
-                user = processed_params.get("user", username)
-                prepend = processed_params.get("prepend", False)
-                
-                if map_key:
-                    url = f"{http_url}/addKey/{map_key}?user={user}"
-                    if prepend:
-                        url += "&prepend=true"
-                        
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(url) as response:
-                            if response.status == 200:
-                                data = await response.json()
-                                if "Title" in data:
-                                    response_text = f"Added to queue: {data['Title']}"
-                                else:
-                                    response_text = "Song added to queue."
-                            else:
-                                response_text = "Failed to add song to queue."
-                                
-            elif action_type == "queue":
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{http_url}/queue") as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if isinstance(data, list):
-                                if len(data) == 0:
-                                    response_text = "The queue is currently empty."
-                                else:
-                                    response_text = f"Queue has {len(data)} songs."
-                        else:
-                            response_text = "Failed to get queue information."
-                            
-            elif action_type == "where":
-                user = processed_params.get("user", username)
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{http_url}/queue/where/{user}") as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if isinstance(data, list) and len(data) > 0:
-                                response_text = f"{user} has {len(data)} songs in queue. Next position: {data[0].get('Spot')}"
-                            else:
-                                response_text = f"{user} has no songs in queue."
-                        else:
-                            response_text = "Failed to check queue position."
-                            
-            elif action_type == "clear":
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{http_url}/queue/clear") as response:
-                        if response.status == 200:
-                            response_text = "Queue has been cleared."
-                        else:
-                            response_text = "Failed to clear the queue."
-                            
-            elif action_type == "open":
-                open_value = processed_params.get("open", True)
-                status = "true" if open_value else "false"
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{http_url}/queue/open/{status}") as response:
-                        if response.status == 200:
-                            response_text = f"Queue is now {'open' if open_value else 'closed'}."
-                        else:
-                            response_text = "Failed to change queue status."
-                            
-            elif action_type == "move":
-                from_pos = processed_params.get("from", 1)
-                to_pos = processed_params.get("to", 1)
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{http_url}/queue/move/{from_pos}/{to_pos}") as response:
-                        if response.status == 200:
-                            response_text = f"Moved queue entry from position {from_pos} to {to_pos}."
-                        else:
-                            response_text = "Failed to move queue entry."
-                            
-            elif action_type == "shuffle":
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{http_url}/queue/shuffle") as response:
-                        if response.status == 200:
-                            response_text = "Queue has been shuffled."
-                        else:
-                            response_text = "Failed to shuffle the queue."
-                            
-            elif action_type == "history":
-                limit = processed_params.get("limit", 5)
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{http_url}/history?limit={limit}") as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if isinstance(data, list) and len(data) > 0:
-                                response_text = f"Last played: {data[0].get('HistoryItem', {}).get('Title', 'Unknown')}"
-                            else:
-                                response_text = "No play history available."
-                        else:
-                            response_text = "Failed to get play history."
-            
-            if response_text and twitch_channel:
-                await twitch_channel.send(response_text)
-                self.log_message(f"Mod action response: {response_text}")
-                
-        except Exception as e:
-            self.log_message(f"Error executing mod action: {str(e)}")
-            if twitch_channel:
-                await twitch_channel.send(f"Error executing DumbRequestManager action: {str(e)}")
+        dropped = stats["dropped_mirror"] + stats["dropped_response"] + stats["dropped_offline"]
+        text = f"{stats['depth']} queued, {stats['sent']} sent, {stats['coalesced']} coalesced, {dropped} dropped"
+        if stats["spooled"]:
+            text += f", {stats['spooled']} spooled"
+        self.outbound_status.setText(text)
+
+    def update_latency_table(self, snapshot):
+        rows = []
+        for name, labels, count, percentiles, maximum in snapshot:
+            if not count:
+                continue
+            title = name.replace("layconnector_", "").replace("_seconds", "").replace("_", " ")
+            if labels:
+                title += " (" + ", ".join(str(value) for value in labels.values()) + ")"
+            rows.append((title, count, percentiles[0], percentiles[2], maximum))
+        rows.sort()
+        
+        self.latency_table.setRowCount(len(rows))
+        for row, (title, count, p50, p99, maximum) in enumerate(rows):
+            cells = [title, str(count), f"{p50 * 1000:.1f} ms", f"{p99 * 1000:.1f} ms", f"{maximum * 1000:.1f} ms"]
+            for column, text in enumerate(cells):
+                self.latency_table.setItem(row, column, QTableWidgetItem(text))
+
+
+def on_window_ready(args):
+    startup_timer.mark("window ready")
+    if args.startup_timing:
+        startup_timer.report()
+    if args.startup_timing_file:
+        startup_timer.write(args.startup_timing_file, "gui")
+    if args.exit_after_startup:
+        QApplication.instance().quit()
 
 
 if __name__ == "__main__":
-    app = QApplication([])
-    cfg = ensure_config()
-    if not cfg["tiktok_username"] or not cfg["twitch_username"] or not cfg["twitch_token"]:
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
+    parser = argparse.ArgumentParser(description="LayConnector: TikTok to Twitch chat relay.")
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="print how long each startup phase took")
+    parser.add_argument("--startup-timing-file",
+                        help="append startup phase timings as a JSON line to this file")
+    parser.add_argument("--exit-after-startup", action="store_true",
+                        help="quit as soon as the window is ready (for timing runs)")
+    args, qt_args = parser.parse_known_args()
+    
+    app = QApplication([parser.prog] + qt_args)
+    startup_timer.mark("create QApplication")
+    try:
+        cfg = ensure_config()
+    except ConfigError as e:
+        QMessageBox.critical(None, "Invalid Configuration", f"Could not load {CONFIG_FILE}:\n\n{str(e)}")
+        sys.exit(2)
+    startup_timer.mark("load config")
+    if not is_configured(cfg):
         win = SetupWizard()
     else:
-        win = MainWindow()
+        win = MainWindow(cfg)
+    startup_timer.mark("build window")
     win.show()
+    startup_timer.mark("show window")
+    QTimer.singleShot(0, lambda: on_window_ready(args))
     app.exec()
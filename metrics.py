@@ -0,0 +1,204 @@
+import asyncio
+import time
+
+SUB_BUCKETS = 16
+MAX_MICROSECONDS = 3600 * 1000000
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9464
+
+
+def _bucket_index(value):
+    if value < SUB_BUCKETS:
+        return value
+    exponent = value.bit_length() - 5
+    return exponent * SUB_BUCKETS + (value >> exponent)
+
+
+def _bucket_value(index):
+    if index < SUB_BUCKETS:
+        return index
+    exponent = index // SUB_BUCKETS - 1
+    mantissa = index % SUB_BUCKETS + SUB_BUCKETS
+    # middle of the bucket, so percentiles are off by at most half a bucket (~3%)
+    return (mantissa << exponent) + ((1 << exponent) >> 1)
+
+
+BUCKET_COUNT = _bucket_index(MAX_MICROSECONDS) + 1
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = int(seconds * 1000000)
+        if micros < 0:
+            micros = 0
+        elif micros > MAX_MICROSECONDS:
+            micros = MAX_MICROSECONDS
+        self.counts[_bucket_index(micros)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentiles(self, quantiles=QUANTILES):
+        counts = list(self.counts)
+        count = sum(counts)
+        results = []
+        if not count:
+            return [0.0 for _ in quantiles]
+        targets = [max(1, int(q * count + 0.5)) for q in quantiles]
+        seen = 0
+        target = 0
+        for index, bucket in enumerate(counts):
+            if not bucket:
+                continue
+            seen += bucket
+            while target < len(targets) and seen >= targets[target]:
+                results.append(_bucket_value(index) / 1000000)
+                target += 1
+            if target == len(targets):
+                break
+        return results
+
+    def percentile(self, quantile):
+        return self.percentiles((quantile,))[0]
+
+
+class Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+        self.collectors = []
+
+    def histogram(self, name, help_text="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+            self.help.setdefault(name, help_text)
+        return histogram
+
+    def timer(self, name, help_text="", **labels):
+        return Timer(self.histogram(name, help_text, **labels))
+
+    def inc(self, name, help_text="", amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+        self.help.setdefault(name, help_text)
+
+    def register(self, collector):
+        self.collectors.append(collector)
+
+    def snapshot(self):
+        return [
+            (name, dict(labels), histogram.count, histogram.percentiles(), histogram.max)
+            for (name, labels), histogram in list(self.histograms.items())
+        ]
+
+    def prometheus_text(self):
+        lines = []
+        families = {}
+        for (name, labels), histogram in list(self.histograms.items()):
+            families.setdefault((name, "summary"), []).append((labels, histogram))
+        for (name, labels), value in list(self.counters.items()):
+            families.setdefault((name, "counter"), []).append((labels, value))
+        for collector in self.collectors:
+            for name, kind, help_text, labels, value in collector():
+                self.help.setdefault(name, help_text)
+                families.setdefault((name, kind), []).append((tuple(sorted(labels.items())), value))
+
+        for (name, kind), samples in families.items():
+            lines.append(f"# HELP {name} {self.help.get(name, '')}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind != "summary":
+                    lines.append(f"{name}{_label_text(labels)} {value}")
+                    continue
+                for quantile, seconds in zip(QUANTILES, value.percentiles()):
+                    lines.append(f"{name}{_label_text(labels + (('quantile', quantile),))} {seconds:.6f}")
+                lines.append(f"{name}_sum{_label_text(labels)} {value.total:.6f}")
+                lines.append(f"{name}_count{_label_text(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    def __init__(self, metrics, host=DEFAULT_HOST, port=DEFAULT_PORT, log=None):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.log = log
+
+    @classmethod
+    def from_settings(cls, settings, metrics, log=None):
+        return cls(
+            metrics,
+            host=settings.get("host", DEFAULT_HOST),
+            port=settings.get("port", DEFAULT_PORT),
+            log=log,
+        )
+
+    async def handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status = "200 OK"
+                body = self.metrics.prometheus_text().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status = "404 Not Found"
+                body = b"Not found\n"
+                content_type = "text/plain"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def run(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        if self.log:
+            self.log(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        async with server:
+            await server.serve_forever()
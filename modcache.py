@@ -0,0 +1,89 @@
+import asyncio
+import collections
+import time
+
+DEFAULT_TTLS = {
+    "query": 300,
+    "queue": 5,
+    "where": 5,
+    "history": 10,
+}
+DEFAULT_MAX_ENTRIES = 512
+
+
+class ResponseCache:
+    def __init__(self, ttls=None, max_entries=DEFAULT_MAX_ENTRIES, clock=time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = collections.OrderedDict()
+        self.inflight = {}
+        self.generations = collections.defaultdict(int)
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            ttls=settings.get("ttls"),
+            max_entries=settings.get("max_entries", DEFAULT_MAX_ENTRIES),
+        )
+
+    async def get(self, endpoint, key, fetch):
+        ttl = self.ttls.get(endpoint, 0)
+        if not ttl:
+            return await fetch()
+
+        key = (endpoint, key)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] > self.clock():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self.entries[key]
+
+        task = self.inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        generation = self.generations[endpoint]
+        task = asyncio.ensure_future(fetch())
+        self.inflight[key] = task
+        task.add_done_callback(lambda done: self._store(key, endpoint, generation, ttl, done))
+        return await asyncio.shield(task)
+
+    def _store(self, key, endpoint, generation, ttl, task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        status, data = task.result()
+        if status != 200 or self.generations[endpoint] != generation:
+            return
+        self.entries[key] = (self.clock() + ttl, (status, data))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, *endpoints):
+        for endpoint in endpoints:
+            self.generations[endpoint] += 1
+        for key in [key for key in self.entries if key[0] in endpoints]:
+            del self.entries[key]
+        for key in [key for key in self.inflight if key[0] in endpoints]:
+            del self.inflight[key]
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,106 @@
+import json
+import time
+
+from breaker import CircuitOpenError
+from modcache import ResponseCache
+
+DEFAULT_CONNECTION_LIMIT = 10
+DEFAULT_REQUEST_TIMEOUT = 5
+DEFAULT_CONNECT_TIMEOUT = 2
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+
+
+class ModClient:
+    def __init__(self, http_url, connection_limit=DEFAULT_CONNECTION_LIMIT,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT, cache=None, metrics=None, breaker=None):
+        self.http_url = http_url.rstrip("/")
+        self.cache = cache
+        self.connection_limit = connection_limit
+        self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.session = None
+        self.metrics = metrics
+        self.breaker = breaker
+        self.latency = {}
+
+    @classmethod
+    def from_settings(cls, mod_settings, metrics=None, breaker=None):
+        return cls(
+            mod_settings.get("http_url", "http://localhost:13337"),
+            connection_limit=mod_settings.get("connection_limit", DEFAULT_CONNECTION_LIMIT),
+            request_timeout=mod_settings.get("request_timeout", DEFAULT_REQUEST_TIMEOUT),
+            connect_timeout=mod_settings.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+            keepalive_timeout=mod_settings.get("keepalive_timeout", DEFAULT_KEEPALIVE_TIMEOUT),
+            cache=ResponseCache.from_settings(mod_settings.get("cache", {})),
+            metrics=metrics,
+            breaker=breaker,
+        )
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            import aiohttp
+            
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout, sock_connect=self.connect_timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    async def get(self, path, params=None, endpoint=None):
+        if endpoint is None or self.cache is None:
+            return await self._fetch(path, params)
+        key = (path, tuple(sorted(params.items())) if params else ())
+        return await self.cache.get(endpoint, key, lambda: self._fetch(path, params))
+
+    def invalidate(self, *endpoints):
+        if self.cache is not None:
+            self.cache.invalidate(*endpoints)
+
+    def _latency(self, path):
+        route = path.split("/")[1] if path.startswith("/") else path
+        histogram = self.latency.get(route)
+        if histogram is None:
+            histogram = self.latency[route] = self.metrics.histogram(
+                "layconnector_mod_http_seconds", "DumbRequestManager HTTP request time", route=route
+            )
+        return histogram
+
+    async def _fetch(self, path, params=None):
+        breaker = self.breaker
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"DumbRequestManager is unavailable, retrying in {breaker.retry_in():.0f} seconds")
+        session = self._get_session()
+        started = time.perf_counter()
+        try:
+            async with session.get(f"{self.http_url}{path}", params=params) as response:
+                body = await response.read()
+                data = None
+                if response.status == 200 and body:
+                    try:
+                        data = json.loads(body)
+                    except ValueError:
+                        data = None
+            if breaker is not None:
+                if response.status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            return response.status, data
+        except BaseException:
+            # timeouts cancelled from outside count too, otherwise a hung probe would keep the breaker half-open
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        finally:
+            if self.metrics is not None:
+                self._latency(path).record(time.perf_counter() - started)
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
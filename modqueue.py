@@ -0,0 +1,137 @@
+import asyncio
+
+DEFAULT_RESYNC_INTERVAL = 60
+DEFAULT_HISTORY_SIZE = 20
+
+REMOVE_EVENTS = ("pressedPlay", "pressedSkip", "pressedBan")
+ADD_EVENTS = ("mapAdded", "requestAdded")
+IGNORED_EVENTS = ("pressedPoke", "pressedLink")
+
+
+def _entry_id(entry):
+    if not isinstance(entry, dict):
+        return None
+    return entry.get("Hash") or entry.get("BsrKey") or entry.get("Key")
+
+
+class QueueMirror:
+    def __init__(self, client, resync_interval=DEFAULT_RESYNC_INTERVAL, history_size=DEFAULT_HISTORY_SIZE, log=None):
+        self.client = client
+        self.resync_interval = resync_interval
+        self.history_size = history_size
+        self.log = log
+
+        self.queue = []
+        self.history = []
+        self.is_open = None
+        self.synced = False
+        self.dirty = True
+        self.live = False
+        self.events = 0
+        self.wakeup = asyncio.Event()
+
+        self.local_answers = 0
+        self.resyncs = 0
+
+    @classmethod
+    def from_settings(cls, settings, client, log=None):
+        return cls(
+            client,
+            resync_interval=settings.get("resync_interval", DEFAULT_RESYNC_INTERVAL),
+            history_size=settings.get("history_size", DEFAULT_HISTORY_SIZE),
+            log=log,
+        )
+
+    @property
+    def fresh(self):
+        return self.live and self.synced and not self.dirty
+
+    def set_live(self, live):
+        self.live = live
+        self.request_resync()
+
+    def request_resync(self):
+        self.dirty = True
+        self.wakeup.set()
+
+    async def resync(self):
+        events_before = self.events
+        queue_status, queue = await self.client.get("/queue")
+        history_status, history = await self.client.get("/history", params={"limit": self.history_size})
+        if queue_status != 200 or not isinstance(queue, list):
+            raise RuntimeError(f"queue resync failed with status {queue_status}")
+        if history_status != 200 or not isinstance(history, list):
+            raise RuntimeError(f"history resync failed with status {history_status}")
+
+        self.queue = queue
+        self.history = history[:self.history_size]
+        self.synced = True
+        self.dirty = self.events != events_before
+        self.resyncs += 1
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+            try:
+                await self.resync()
+                if self.dirty:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.dirty = True
+                if self.log:
+                    self.log(f"Queue mirror resync failed: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.resync_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def apply_event(self, event_type, data):
+        self.events += 1
+
+        if event_type in REMOVE_EVENTS:
+            entry_id = _entry_id(data)
+            if entry_id is None:
+                self.request_resync()
+                return
+            self.queue = [entry for entry in self.queue if _entry_id(entry) != entry_id]
+            if event_type == "pressedPlay":
+                self.history.insert(0, {"HistoryItem": data})
+                del self.history[self.history_size:]
+
+        elif event_type in ADD_EVENTS:
+            if _entry_id(data) is None:
+                self.request_resync()
+                return
+            self.queue.append(data)
+
+        elif event_type == "queueOpen":
+            self.is_open = bool(data)
+
+        elif event_type not in IGNORED_EVENTS:
+            self.request_resync()
+
+    def lookup(self, endpoint, user=None, limit=None):
+        if not self.fresh:
+            return None
+
+        result = None
+        if endpoint == "queue":
+            result = self.queue
+        elif endpoint == "where":
+            user = str(user).lower()
+            result = [
+                dict(entry, Spot=spot)
+                for spot, entry in enumerate(self.queue, 1)
+                if str(entry.get("User", "")).lower() == user
+            ]
+        elif endpoint == "history":
+            complete = len(self.history) < self.history_size
+            if limit is None or complete or len(self.history) >= limit:
+                result = self.history[:limit]
+
+        if result is not None:
+            self.local_answers += 1
+        return result
@@ -0,0 +1,243 @@
+import asyncio
+import collections
+import time
+
+from spool import Spool
+
+TWITCH_MESSAGE_LIMIT = 500
+
+RATE_LIMITS = {
+    "normal": (20, 30.0),
+    "moderator": (100, 30.0),
+}
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+DEFAULT_MIRROR_QUEUE_SIZE = 200
+DEFAULT_RESPONSE_QUEUE_SIZE = 200
+DEFAULT_SEPARATOR = " | "
+DEFAULT_OFFLINE_POLL = 1.0
+
+
+class SendWindow:
+    def __init__(self, limit, per, clock=time.monotonic):
+        self.limit = limit
+        self.per = per
+        self.clock = clock
+        self.sent = collections.deque()
+
+    async def acquire(self):
+        # remembering each send keeps any `per` seconds at `limit` messages, even straight after an idle spell
+        while True:
+            now = self.clock()
+            while self.sent and now - self.sent[0] >= self.per:
+                self.sent.popleft()
+            if len(self.sent) < self.limit:
+                self.sent.append(now)
+                return now
+            await asyncio.sleep(self.sent[0] + self.per - now)
+
+    def release(self, stamp):
+        # hands back a slot that was acquired but not used for a send
+        try:
+            self.sent.remove(stamp)
+        except ValueError:
+            pass
+
+
+def resolve_rate_limit(rate_limit):
+    if isinstance(rate_limit, (list, tuple)) and len(rate_limit) == 2:
+        return int(rate_limit[0]), float(rate_limit[1])
+    if rate_limit not in RATE_LIMITS:
+        raise ValueError(f"Unknown Twitch rate limit: {rate_limit}")
+    return RATE_LIMITS[rate_limit]
+
+
+class OutboundQueue:
+    def __init__(self, get_channel, rate_limit="normal", mirror_queue_size=DEFAULT_MIRROR_QUEUE_SIZE,
+                 response_queue_size=DEFAULT_RESPONSE_QUEUE_SIZE, drop_policy=DROP_OLDEST,
+                 coalesce=True, separator=DEFAULT_SEPARATOR, log=None, window=None, metrics=None, name="",
+                 spool=None, offline_poll=DEFAULT_OFFLINE_POLL):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.get_channel = get_channel
+        self.window = window or SendWindow(*resolve_rate_limit(rate_limit))
+        self.mirror_queue_size = mirror_queue_size
+        self.response_queue_size = response_queue_size
+        self.drop_policy = drop_policy
+        self.coalesce = coalesce
+        self.separator = separator
+        self.log = log
+        self.spool = spool
+        self.offline_poll = offline_poll
+        self.send_latency = None
+        self.relay_latency = None
+        if metrics is not None:
+            self.send_latency = metrics.histogram(
+                "layconnector_send_seconds", "Time for one Twitch channel.send call", channel=name
+            )
+            self.relay_latency = metrics.histogram(
+                "layconnector_relay_seconds", "Time from a TikTok comment arriving to its Twitch message being sent",
+                channel=name
+            )
+
+        self.responses = collections.deque()
+        self.mirrors = collections.deque()
+        self.wakeup = asyncio.Event()
+
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.dropped_mirror = 0
+        self.dropped_response = 0
+        self.dropped_offline = 0
+
+    @staticmethod
+    def shared_window(settings):
+        return SendWindow(*resolve_rate_limit(settings.get("rate_limit", "normal")))
+
+    @classmethod
+    def from_settings(cls, settings, get_channel, log=None, window=None, metrics=None, name=""):
+        spool_settings = settings.get("spool", {})
+        return cls(
+            get_channel,
+            rate_limit=settings.get("rate_limit", "normal"),
+            mirror_queue_size=settings.get("mirror_queue_size", DEFAULT_MIRROR_QUEUE_SIZE),
+            response_queue_size=settings.get("response_queue_size", DEFAULT_RESPONSE_QUEUE_SIZE),
+            drop_policy=settings.get("drop_policy", DROP_OLDEST),
+            coalesce=settings.get("coalesce", True),
+            separator=settings.get("separator", DEFAULT_SEPARATOR),
+            log=log,
+            window=window,
+            metrics=metrics,
+            name=name,
+            spool=Spool.from_settings(spool_settings, name) if spool_settings.get("enabled", False) else None,
+        )
+
+    def _enqueue(self, queue, limit, text, received):
+        if len(queue) >= limit:
+            if self.drop_policy == DROP_NEWEST:
+                return False
+            queue.popleft()
+            queue.append((text[:TWITCH_MESSAGE_LIMIT], received))
+            self.wakeup.set()
+            return False
+        queue.append((text[:TWITCH_MESSAGE_LIMIT], received))
+        self.wakeup.set()
+        return True
+
+    def send(self, text, received=None):
+        if not self._enqueue(self.responses, self.response_queue_size, text, received):
+            self.dropped_response += 1
+
+    def mirror(self, text, received=None):
+        if not self._enqueue(self.mirrors, self.mirror_queue_size, text, received):
+            self.dropped_mirror += 1
+
+    def depth(self):
+        return len(self.responses) + len(self.mirrors)
+
+    def spooled(self):
+        return self.spool is not None and self.spool.pending > 0
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "response_depth": len(self.responses),
+            "mirror_depth": len(self.mirrors),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "dropped_mirror": self.dropped_mirror,
+            "dropped_response": self.dropped_response,
+            "dropped_offline": self.dropped_offline,
+            "spooled": self.spool.pending if self.spool is not None else 0,
+        }
+
+    def _next_message(self):
+        if self.responses:
+            text, received = self.responses.popleft()
+            return text, [received]
+
+        text, received = self.mirrors.popleft()
+        if not self.coalesce:
+            return text, [received]
+
+        parts = [text]
+        arrivals = [received]
+        length = len(text)
+        while self.mirrors:
+            extra = len(self.separator) + len(self.mirrors[0][0])
+            if length + extra > TWITCH_MESSAGE_LIMIT:
+                break
+            text, received = self.mirrors.popleft()
+            parts.append(text)
+            arrivals.append(received)
+            length += extra
+        self.coalesced += len(parts) - 1
+        return self.separator.join(parts), arrivals
+
+    async def _wait_online(self):
+        # spooled messages are whole Twitch messages, so coalescing happens before they hit the disk
+        while self.responses or self.mirrors:
+            text, arrivals = self._next_message()
+            self.spool.append(text)
+        self.wakeup.clear()
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), self.offline_poll)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        try:
+            await self._run()
+        finally:
+            if self.spool is not None:
+                self.spool.close()
+
+    async def _run(self):
+        while True:
+            replaying = self.spooled()
+            if not replaying and not self.responses and not self.mirrors:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            if self.get_channel() is None:
+                if self.spool is not None:
+                    await self._wait_online()
+                else:
+                    self._next_message()
+                    self.dropped_offline += 1
+                continue
+
+            stamp = await self.window.acquire()
+            channel = self.get_channel()
+            if channel is None:
+                # the channel dropped while waiting for a slot; nothing was taken off the queues or the spool yet
+                self.window.release(stamp)
+                continue
+            if replaying:
+                text = self.spool.pop()
+                if text is None:
+                    self.window.release(stamp)
+                    continue
+                arrivals = ()
+            else:
+                text, arrivals = self._next_message()
+
+            try:
+                started = time.perf_counter()
+                await channel.send(text)
+                self.sent += 1
+                if self.send_latency is not None:
+                    self.send_latency.record(time.perf_counter() - started)
+                    now = time.monotonic()
+                    for received in arrivals:
+                        if received is not None:
+                            self.relay_latency.record(now - received)
+            except Exception as e:
+                self.failed += 1
+                if self.log:
+                    self.log(f"Failed to send Twitch message: {str(e)}")
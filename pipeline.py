@@ -0,0 +1,136 @@
+import asyncio
+import inspect
+import time
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST)
+
+DEFAULT_QUEUE_SIZE = 1000
+
+
+class Stage:
+    def __init__(self, name, handler, workers=1, queue_size=DEFAULT_QUEUE_SIZE, overflow=OVERFLOW_BLOCK, latency=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy for stage {name}: {overflow}")
+        if workers < 1:
+            raise ValueError(f"Stage {name} needs at least one worker")
+        self.name = name
+        self.handler = handler
+        self.is_async = inspect.iscoroutinefunction(handler)
+        self.workers = workers
+        self.overflow = overflow
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.next = None
+        self.latency = latency
+
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow == OVERFLOW_DROP_OLDEST:
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.queue.put_nowait(item)
+        self.dropped += 1
+        return False
+
+    async def put(self, item):
+        if self.overflow == OVERFLOW_BLOCK:
+            await self.queue.put(item)
+        else:
+            self.offer(item)
+
+    async def work(self, on_error):
+        while True:
+            item = await self.queue.get()
+            try:
+                started = time.perf_counter()
+                if self.is_async:
+                    result = await self.handler(item)
+                else:
+                    result = self.handler(item)
+                if self.latency is not None:
+                    self.latency.record(time.perf_counter() - started)
+                self.processed += 1
+                if result is not None and self.next is not None:
+                    await self.next.put(result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                on_error(self, e)
+            finally:
+                self.queue.task_done()
+
+    def stats(self):
+        return {
+            "depth": self.queue.qsize(),
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+class Pipeline:
+    def __init__(self, stages, log=None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        if stages[0].overflow == OVERFLOW_BLOCK:
+            raise ValueError("The first pipeline stage must drop on overflow, it cannot block")
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+        self.stages = stages
+        self.log = log
+
+    @classmethod
+    def from_settings(cls, settings, handlers, log=None, metrics=None):
+        stages = []
+        for index, spec in enumerate(handlers):
+            name, handler = spec[0], spec[1]
+            default_workers = spec[2] if len(spec) > 2 else 1
+            stage_settings = settings.get(name, {})
+            default_overflow = OVERFLOW_DROP_OLDEST if index == 0 else OVERFLOW_BLOCK
+            stages.append(Stage(
+                name,
+                handler,
+                workers=stage_settings.get("workers", default_workers),
+                queue_size=stage_settings.get("queue_size", DEFAULT_QUEUE_SIZE),
+                overflow=stage_settings.get("overflow", default_overflow),
+                latency=metrics.histogram(
+                    "layconnector_stage_seconds", "Time spent in one relay pipeline stage", stage=name
+                ) if metrics is not None else None,
+            ))
+        return cls(stages, log=log)
+
+    def submit(self, item):
+        return self.stages[0].offer(item)
+
+    def _on_error(self, stage, error):
+        if self.log:
+            self.log(f"Error in {stage.name} stage: {str(error)}")
+
+    async def run(self):
+        workers = []
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                workers.append(stage.work(self._on_error))
+        await asyncio.gather(*workers)
+
+    def depth(self):
+        return sum(stage.queue.qsize() for stage in self.stages)
+
+    def dropped(self):
+        return sum(stage.dropped for stage in self.stages)
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
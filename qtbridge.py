@@ -0,0 +1,45 @@
+import collections
+import threading
+
+from PySide6.QtCore import QObject, Signal, Qt
+
+
+class ConnectorBridge(QObject):
+    pending = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lock = threading.Lock()
+        self.events = []
+        self.handlers = {}
+        self.pending.connect(self.flush, Qt.QueuedConnection)
+
+    def on(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def post(self, kind, *args):
+        with self.lock:
+            self.events.append((kind, args))
+            first = len(self.events) == 1
+        if first:
+            self.pending.emit()
+
+    def flush(self):
+        with self.lock:
+            events, self.events = self.events, []
+
+        statuses = collections.OrderedDict()
+        others = []
+        for kind, args in events:
+            if kind == "status":
+                statuses[args[0]] = args
+            else:
+                others.append((kind, args))
+
+        if "status" in self.handlers:
+            for args in statuses.values():
+                self.handlers["status"](*args)
+        for kind, args in others:
+            handler = self.handlers.get(kind)
+            if handler:
+                handler(*args)
@@ -0,0 +1,86 @@
+import random
+import time
+
+DEFAULT_INITIAL_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_FACTOR = 2.0
+DEFAULT_JITTER = 0.5
+
+
+class Backoff:
+    def __init__(self, initial=DEFAULT_INITIAL_DELAY, maximum=DEFAULT_MAX_DELAY,
+                 factor=DEFAULT_FACTOR, jitter=DEFAULT_JITTER, rng=random.random):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.rng = rng
+        self.attempts = 0
+        self.delay = min(maximum, initial)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            initial=float(settings.get("initial_delay", DEFAULT_INITIAL_DELAY)),
+            maximum=float(settings.get("max_delay", DEFAULT_MAX_DELAY)),
+            factor=float(settings.get("factor", DEFAULT_FACTOR)),
+            jitter=float(settings.get("jitter", DEFAULT_JITTER)),
+        )
+
+    def reset(self):
+        self.attempts = 0
+        self.delay = min(self.maximum, self.initial)
+
+    def next_delay(self):
+        delay = self.delay
+        # growing the last delay instead of raising factor to the attempt count cannot overflow on long outages
+        self.delay = min(self.maximum, delay * self.factor)
+        self.attempts += 1
+        if self.jitter:
+            delay *= 1 - self.jitter * self.rng()
+        return delay
+
+
+class ReconnectStats:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.connected = False
+        self.connects = 0
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.disconnected_at = None
+        self.last_reconnect_seconds = None
+        self.max_reconnect_seconds = 0.0
+        self.total_reconnect_seconds = 0.0
+
+    def on_connect(self):
+        now = self.clock()
+        if self.disconnected_at is not None:
+            elapsed = now - self.disconnected_at
+            self.reconnects += 1
+            self.last_reconnect_seconds = elapsed
+            self.max_reconnect_seconds = max(self.max_reconnect_seconds, elapsed)
+            self.total_reconnect_seconds += elapsed
+            self.disconnected_at = None
+        self.connects += 1
+        self.connected = True
+
+    def on_disconnect(self):
+        if self.connected:
+            self.connected = False
+            self.disconnected_at = self.clock()
+
+    def on_failed_attempt(self):
+        self.failed_attempts += 1
+
+    def stats(self):
+        average = self.total_reconnect_seconds / self.reconnects if self.reconnects else None
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "failed_attempts": self.failed_attempts,
+            "last_reconnect_seconds": self.last_reconnect_seconds,
+            "max_reconnect_seconds": self.max_reconnect_seconds,
+            "avg_reconnect_seconds": average,
+        }
@@ -0,0 +1,94 @@
+from actions import ActionSet
+from triggers import MATCH_ALL
+
+DEFAULT_ROUTE = "default"
+
+
+def _names(value, strip=""):
+    if isinstance(value, str):
+        value = [value]
+    names = []
+    for name in value or []:
+        name = name.strip().lstrip(strip)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class Route:
+    __slots__ = ("name", "sources", "channels", "mirror", "action_set")
+
+    def __init__(self, name, sources, channels, action_set, mirror=True):
+        self.name = name
+        self.sources = sources
+        self.channels = channels
+        self.action_set = action_set
+        self.mirror = mirror
+
+
+def build_routes(cfg):
+    routes_cfg = cfg.get("routes")
+    if not routes_cfg:
+        return [Route(
+            DEFAULT_ROUTE,
+            _names(cfg["tiktok_username"], "@"),
+            _names(cfg["twitch_username"], "#"),
+            ActionSet.from_config(cfg),
+        )]
+
+    shared = {}
+    routes = []
+    for n, route in enumerate(routes_cfg):
+        actions = route.get("actions", cfg["actions"])
+        mode = route.get("trigger_match", cfg.get("trigger_match", MATCH_ALL))
+        key = (id(actions), mode)
+        if key not in shared:
+            shared[key] = ActionSet(actions, mode)
+        routes.append(Route(
+            route.get("name") or f"route{n + 1}",
+            _names(route.get("tiktok") or cfg["tiktok_username"], "@"),
+            _names(route.get("twitch") or cfg["twitch_username"], "#"),
+            shared[key],
+            mirror=route.get("mirror", True),
+        ))
+    return routes
+
+
+class RouteTable:
+    __slots__ = ("version", "routes", "by_source")
+
+    def __init__(self, routes, version=0):
+        self.version = version
+        self.routes = routes
+        self.by_source = {}
+        for route in routes:
+            for source in route.sources:
+                self.by_source.setdefault(source, []).append(route)
+
+    @classmethod
+    def from_config(cls, cfg, version=0):
+        return cls(build_routes(cfg), version)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def sources(self):
+        return list(self.by_source)
+
+    def channels(self):
+        channels = []
+        for route in self.routes:
+            for channel in route.channels:
+                if channel not in channels:
+                    channels.append(channel)
+        return channels
+
+    def routes_for(self, source):
+        return self.by_source.get(source, ())
+
+    def topology(self):
+        return sorted((sorted(route.sources), sorted(route.channels)) for route in self.routes)
+
+    def action_count(self):
+        unique = {id(route.action_set): route.action_set for route in self.routes}
+        return sum(len(action_set) for action_set in unique.values())
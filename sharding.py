@@ -0,0 +1,262 @@
+import asyncio
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import zlib
+
+from connector import Connector
+from reconnect import Backoff
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_CHECK_INTERVAL = 1.0
+DEFAULT_STABLE_AFTER = 60.0
+_STOP = None
+
+
+def shard_of(source, workers):
+    return zlib.crc32(source.lower().encode("utf-8")) % workers
+
+
+def assign_sources(sources, workers):
+    shards = {}
+    for source in sources:
+        shards.setdefault(shard_of(source, workers), []).append(source)
+    return shards
+
+
+class RemoteOutbox:
+    __slots__ = ("channel", "queue", "dropped")
+
+    def __init__(self, channel, out_queue):
+        self.channel = channel
+        self.queue = out_queue
+        self.dropped = 0
+
+    def _put(self, kind, text, received):
+        try:
+            self.queue.put_nowait((kind, self.channel, text, received))
+        except queue.Full:
+            self.dropped += 1
+
+    def send(self, text, received=None):
+        self._put("send", text, received)
+
+    def mirror(self, text, received=None):
+        self._put("mirror", text, received)
+
+
+class ShardWorker(Connector):
+    def __init__(self, cfg, sources, out_queue, config_path=None):
+        super().__init__(cfg, log=self.forward_log, config_path=config_path)
+        self.sources = sources
+        self.queue = out_queue
+
+    def forward_log(self, message, source):
+        try:
+            self.queue.put_nowait(("log", message, source))
+        except queue.Full:
+            pass
+
+    def tiktok_source_connected(self, source, unique_id, total):
+        self.tiktok_connected.add(source)
+        try:
+            self.queue.put_nowait(("tiktok", source, unique_id))
+        except queue.Full:
+            pass
+
+    def tiktok_source_disconnected(self, source, total):
+        self.tiktok_connected.discard(source)
+        try:
+            self.queue.put_nowait(("tiktok_lost", source))
+        except queue.Full:
+            pass
+
+    async def submit_mod_job(self, item, route, act, params, user_input, username):
+        try:
+            self.queue.put_nowait((
+                "mod", (route.name, act.trigger), act.mod_type, params, user_input, username, route.channels,
+                act.mod_concurrency, act.mod_timeout, act.mod_ordered
+            ))
+        except queue.Full:
+            self.log_message(f"Shard queue full, dropped DumbRequestManager action {act.mod_type}", "error")
+        self.mod_job_done(item, route, act.trigger, None)
+
+    async def restart_mod(self):
+        pass
+
+    async def run(self):
+        self.prepare_loop()
+        tiks = []
+        try:
+            tiks = self.make_tiktok_clients(self.sources, len(self.sources))
+            self.outboxes = {channel: RemoteOutbox(channel, self.queue) for channel in self.routes.channels()}
+            self.pipeline = self.build_pipeline()
+
+            tasks = [self.run_tiktok_source(source, tik, len(tiks)) for source, tik in zip(self.sources, tiks)]
+            tasks.extend(self.relay_tasks())
+            if self.config_path:
+                tasks.append(self.watch_config())
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for tik in tiks:
+                try:
+                    await tik.disconnect()
+                except Exception:
+                    pass
+            self.running = False
+
+
+def worker_main(shard, sources, cfg, config_path, out_queue):
+    async def main():
+        worker = ShardWorker(cfg, sources, out_queue, config_path)
+        task = asyncio.ensure_future(worker.run())
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, task.cancel)
+            except (NotImplementedError, AttributeError, ValueError):
+                pass
+        await task
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardSupervisor:
+    def __init__(self, workers, cfg, sources, config_path, on_messages, queue_size=DEFAULT_QUEUE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE, check_interval=DEFAULT_CHECK_INTERVAL,
+                 stable_after=DEFAULT_STABLE_AFTER, restart_backoff=None, log=None):
+        self.workers = workers
+        self.cfg = cfg
+        self.sources = sources
+        self.config_path = config_path
+        self.on_messages = on_messages
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.check_interval = check_interval
+        self.stable_after = stable_after
+        self.restart_backoff = restart_backoff or {}
+        self.log = log
+
+        self.shards = {}
+        self.processes = {}
+        self.started_at = {}
+        self.backoffs = {}
+        self.restart_at = {}
+        self.restarts = 0
+        self.queue = None
+        self.reader = None
+
+    @classmethod
+    def from_settings(cls, settings, cfg, sources, config_path, on_messages, log=None):
+        return cls(
+            int(settings.get("workers", 0)),
+            cfg,
+            sources,
+            config_path,
+            on_messages,
+            queue_size=settings.get("queue_size", DEFAULT_QUEUE_SIZE),
+            batch_size=settings.get("batch_size", DEFAULT_BATCH_SIZE),
+            restart_backoff=settings.get("restart_backoff", {}),
+            log=log,
+        )
+
+    def _log(self, message, source="system"):
+        if self.log:
+            self.log(message, source)
+
+    def _start(self, context, shard):
+        process = context.Process(
+            target=worker_main,
+            args=(shard, self.shards[shard], self.cfg, self.config_path, self.queue),
+            name=f"layconnector-shard-{shard}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[shard] = process
+        self.started_at[shard] = time.monotonic()
+
+    def _read(self, loop):
+        while True:
+            message = self.queue.get()
+            if message is _STOP:
+                return
+            batch = [message]
+            while len(batch) < self.batch_size:
+                try:
+                    message = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if message is _STOP:
+                    self._deliver(loop, batch)
+                    return
+                batch.append(message)
+            self._deliver(loop, batch)
+
+    def _deliver(self, loop, batch):
+        try:
+            loop.call_soon_threadsafe(self.on_messages, batch)
+        except RuntimeError:
+            pass
+
+    def _check(self, context):
+        now = time.monotonic()
+        for shard, process in self.processes.items():
+            if process.is_alive():
+                if now - self.started_at[shard] >= self.stable_after:
+                    self.backoffs[shard].reset()
+                continue
+            if shard not in self.restart_at:
+                delay = self.backoffs[shard].next_delay()
+                self.restart_at[shard] = now + delay
+                self._log(f"Shard {shard} exited with code {process.exitcode}, restarting in {delay:.1f} seconds", "error")
+            elif now >= self.restart_at[shard]:
+                del self.restart_at[shard]
+                self.restarts += 1
+                self._start(context, shard)
+
+    async def run(self):
+        context = multiprocessing.get_context("spawn")
+        loop = asyncio.get_running_loop()
+        self.queue = context.Queue(self.queue_size)
+        self.reader = threading.Thread(target=self._read, args=(loop,), name="layconnector-shard-reader", daemon=True)
+        self.reader.start()
+
+        self.shards = assign_sources(self.sources, self.workers)
+        try:
+            for shard in self.shards:
+                self.backoffs[shard] = Backoff.from_settings(self.restart_backoff)
+                self._start(context, shard)
+            self._log(f"Started {len(self.shards)} shard workers for {len(self.sources)} TikTok sources")
+
+            while True:
+                await asyncio.sleep(self.check_interval)
+                self._check(context)
+        finally:
+            await loop.run_in_executor(None, self._stop)
+
+    def _stop(self):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        self.processes = {}
+        self.queue.put(_STOP)
+        self.reader.join(timeout=5)
+
+    def stats(self):
+        return {
+            "workers": len(self.processes),
+            "alive": sum(1 for process in self.processes.values() if process.is_alive()),
+            "restarts": self.restarts,
+        }
@@ -0,0 +1,201 @@
+import collections
+import json
+import os
+import re
+import time
+
+from config import CONFIG_DIR
+
+DEFAULT_DIRECTORY = os.path.join(CONFIG_DIR, "spool")
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+DEFAULT_MAX_AGE = 600.0
+SEGMENT_SUFFIX = ".spool"
+
+
+def _segment_number(filename):
+    if not filename.endswith(SEGMENT_SUFFIX):
+        return None
+    stem = filename[:-len(SEGMENT_SUFFIX)]
+    return int(stem) if stem.isdigit() else None
+
+
+class _Segment:
+    __slots__ = ("number", "path", "size", "records")
+
+    def __init__(self, number, path, size=0, records=0):
+        self.number = number
+        self.path = path
+        self.size = size
+        self.records = records
+
+
+class Spool:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, segment_bytes=DEFAULT_SEGMENT_BYTES,
+                 max_age=DEFAULT_MAX_AGE, clock=time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = max(1, min(segment_bytes, max_bytes // 4))
+        self.max_age = max_age
+        self.clock = clock
+
+        self.segments = collections.deque()
+        self.writer = None
+        self.reader = None
+        self.consumed = 0
+        self.total_bytes = 0
+        self.pending = 0
+
+        self.spooled = 0
+        self.replayed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.corrupt = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    @classmethod
+    def from_settings(cls, settings, name=""):
+        directory = settings.get("directory", DEFAULT_DIRECTORY)
+        if name:
+            directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9_-]", "_", name.lstrip("#")))
+        return cls(
+            directory,
+            max_bytes=int(settings.get("max_bytes", DEFAULT_MAX_BYTES)),
+            segment_bytes=int(settings.get("segment_bytes", DEFAULT_SEGMENT_BYTES)),
+            max_age=float(settings.get("max_age", DEFAULT_MAX_AGE)),
+        )
+
+    def _recover(self):
+        # segments left behind by a crash or an offline shutdown are replayed like fresh ones
+        numbers = sorted(
+            number for number in map(_segment_number, os.listdir(self.directory)) if number is not None
+        )
+        for number in numbers:
+            path = os.path.join(self.directory, f"{number:010d}{SEGMENT_SUFFIX}")
+            with open(path, "rb") as f:
+                data = f.read()
+            segment = _Segment(number, path, len(data), data.count(b"\n"))
+            self.segments.append(segment)
+            self.total_bytes += segment.size
+            self.pending += segment.records
+
+    def _open_segment(self):
+        number = self.segments[-1].number + 1 if self.segments else 1
+        segment = _Segment(number, os.path.join(self.directory, f"{number:010d}{SEGMENT_SUFFIX}"))
+        self.segments.append(segment)
+        self.writer = open(segment.path, "ab", buffering=0)
+
+    def _close_writer(self):
+        if self.writer is not None:
+            os.fsync(self.writer.fileno())
+            self.writer.close()
+            self.writer = None
+
+    def _drop_oldest(self):
+        segment = self.segments.popleft()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        if not self.segments:
+            self._close_writer()
+        lost = segment.records - self.consumed
+        self.consumed = 0
+        self.evicted += lost
+        self.pending -= lost
+        self.total_bytes -= segment.size
+        os.remove(segment.path)
+
+    def append(self, text):
+        line = (json.dumps([round(self.clock(), 3), text], ensure_ascii=False) + "\n").encode("utf-8")
+        if self.writer is not None and self.segments[-1].size + len(line) > self.segment_bytes:
+            self._close_writer()
+        while self.segments and self.total_bytes + len(line) > self.max_bytes:
+            self._drop_oldest()
+        if self.writer is None:
+            self._open_segment()
+
+        self.writer.write(line)
+        segment = self.segments[-1]
+        segment.size += len(line)
+        segment.records += 1
+        self.total_bytes += len(line)
+        self.pending += 1
+        self.spooled += 1
+
+    def _read_line(self):
+        while self.segments:
+            segment = self.segments[0]
+            if self.reader is None:
+                self.reader = open(segment.path, "rb")
+            if self.consumed < segment.records:
+                line = self.reader.readline()
+                if line.endswith(b"\n"):
+                    self.consumed += 1
+                    self.pending -= 1
+                    return line
+            if segment is self.segments[-1] and self.writer is not None:
+                return None
+            self._drop_finished()
+        return None
+
+    def _drop_finished(self):
+        segment = self.segments.popleft()
+        self.reader.close()
+        self.reader = None
+        self.consumed = 0
+        self.total_bytes -= segment.size
+        os.remove(segment.path)
+
+    def pop(self):
+        while True:
+            line = self._read_line()
+            if line is None:
+                self._reset_if_drained()
+                return None
+            try:
+                stamp, text = json.loads(line)
+            except ValueError:
+                self.corrupt += 1
+                continue
+            if self.max_age and self.clock() - stamp > self.max_age:
+                self.expired += 1
+                continue
+            self.replayed += 1
+            if not self.pending:
+                self._reset_if_drained()
+            return text
+
+    def _reset_if_drained(self):
+        if self.pending:
+            return
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        for segment in self.segments:
+            os.remove(segment.path)
+        self.segments.clear()
+        self.consumed = 0
+        self.total_bytes = 0
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        self._close_writer()
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "bytes": self.total_bytes,
+            "segments": len(self.segments),
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "corrupt": self.corrupt,
+        }
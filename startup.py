@@ -0,0 +1,35 @@
+import json
+import sys
+import time
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last, now - self.started))
+        self.last = now
+
+    def total(self):
+        return self.last - self.started
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        stream.write(f"{'phase':<28}{'took':>12}{'elapsed':>12}\n")
+        for phase, took, elapsed in self.phases:
+            stream.write(f"{phase:<28}{took * 1000:>9.1f} ms{elapsed * 1000:>9.1f} ms\n")
+        stream.flush()
+
+    def write(self, path, label):
+        record = {
+            "time": time.time(),
+            "label": label,
+            "total_ms": round(self.total() * 1000, 2),
+            "phases": {phase: round(took * 1000, 2) for phase, took, _ in self.phases},
+        }
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
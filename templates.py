@@ -0,0 +1,175 @@
+import itertools
+import random
+import re
+import time
+
+PLACEHOLDER = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)(?::([^{}]*))?\}")
+ARG_PLACEHOLDER = re.compile(r"arg([1-9][0-9]*)$")
+
+DEFAULT_TIME_FORMAT = "%H:%M:%S"
+DEFAULT_DATE_FORMAT = "%Y-%m-%d"
+
+
+class Template:
+    __slots__ = ("source", "render")
+
+    def __init__(self, source, parts):
+        self.source = source
+        self.render = _build_renderer(parts)
+
+
+def _build_renderer(parts):
+    if not parts:
+        return lambda username, userinput, counters=None: ""
+    if len(parts) == 1 and parts[0].__class__ is str:
+        text = parts[0]
+        return lambda username, userinput, counters=None: text
+
+    # literals are placed once; only the field slots are filled in per render
+    literals = []
+    fields = []
+    counters_seen = {}
+    for part in parts:
+        if part.__class__ is str:
+            literals.append(part)
+            continue
+        literals.append("")
+        if part.__class__ is _Counter:
+            # every use of the same counter in one response shows the same value
+            if part.name not in counters_seen:
+                counters_seen[part.name] = []
+            counters_seen[part.name].append(len(literals) - 1)
+        else:
+            fields.append((len(literals) - 1, part))
+    bumps = [(_counter_bump(name), tuple(slots)) for name, slots in counters_seen.items()]
+    fields = tuple(fields)
+
+    def render(username, userinput, counters=None):
+        out = literals.copy()
+        for slot, field in fields:
+            if field is _username:
+                out[slot] = username
+            elif field is _userinput:
+                out[slot] = userinput
+            else:
+                out[slot] = field(username, userinput, counters)
+        if not bumps:
+            return "".join(out)
+        for bump, slots in bumps:
+            value = str(bump(counters))
+            for slot in slots:
+                out[slot] = value
+        return "".join(out)
+    return render
+
+
+def _counter_bump(name):
+    if not name:
+        counter = itertools.count(1)
+        return lambda counters: next(counter)
+    return lambda counters: _bump(counters, name)
+
+
+def _arg_field(position):
+    index = position - 1
+
+    def field(username, userinput, counters):
+        args = userinput.split()
+        return args[index] if index < len(args) else ""
+    return field
+
+
+def _random_field(options):
+    choices = options.split("|")
+
+    def field(username, userinput, counters):
+        return random.choice(choices)
+    return field
+
+
+class _Counter:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name or ""
+
+
+def _bump(counters, name):
+    if counters is None:
+        return 1
+    value = counters.get(name, 0) + 1
+    counters[name] = value
+    return value
+
+
+def _time_field(fmt):
+    def field(username, userinput, counters):
+        return time.strftime(fmt)
+    return field
+
+
+def _username(username, userinput, counters):
+    return username
+
+
+def _userinput(username, userinput, counters):
+    return userinput
+
+
+def compile_field(name, option):
+    if name == "username" and option is None:
+        return _username
+    if name == "userinput" and option is None:
+        return _userinput
+    if name == "random" and option:
+        return _random_field(option)
+    if name == "counter":
+        return _Counter(option)
+    if name == "time":
+        return _time_field(option or DEFAULT_TIME_FORMAT)
+    if name == "date":
+        return _time_field(option or DEFAULT_DATE_FORMAT)
+    arg = ARG_PLACEHOLDER.match(name)
+    if arg and option is None:
+        return _arg_field(int(arg.group(1)))
+    return None
+
+
+def compile_template(text, scope=None):
+    parts = []
+    pos = 0
+    for match in PLACEHOLDER.finditer(text):
+        field = compile_field(match.group(1), match.group(2))
+        if field is None:
+            continue
+        if field.__class__ is _Counter and not field.name and scope is not None:
+            # keyed by the action and the text, so the count survives the recompile on every config reload
+            field = _Counter((scope, text))
+        if match.start() > pos:
+            parts.append(text[pos:match.start()])
+        parts.append(field)
+        pos = match.end()
+    if pos < len(text):
+        parts.append(text[pos:])
+    return Template(text, parts)
+
+
+def unknown_placeholders(text):
+    return [
+        match.group(0) for match in PLACEHOLDER.finditer(text)
+        if compile_field(match.group(1), match.group(2)) is None
+    ]
+
+
+def compile_params(params, scope=None):
+    return {
+        key: compile_template(value, scope) if isinstance(value, str) else value
+        for key, value in params.items()
+    }
+
+
+def render_params(compiled, username, userinput, counters=None):
+    return {
+        key: value.render(username, userinput, counters) if value.__class__ is Template else value
+        for key, value in compiled.items()
+    }
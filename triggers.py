@@ -0,0 +1,139 @@
+import re
+
+MATCH_ALL = "all"
+MATCH_LONGEST = "longest"
+
+
+class _Node:
+    __slots__ = ("children", "actions")
+
+    def __init__(self):
+        self.children = {}
+        self.actions = []
+
+
+def _trigger_of(act):
+    return act["trigger"]
+
+
+class TriggerIndex:
+    def __init__(self, actions, mode=MATCH_ALL, key=_trigger_of):
+        if mode not in (MATCH_ALL, MATCH_LONGEST):
+            raise ValueError(f"Unknown trigger match mode: {mode}")
+        self.mode = mode
+        self.key = key
+        self.root = _Node()
+        self.size = 0
+        for order, act in enumerate(actions):
+            self.add(act, order)
+
+    def add(self, act, order=None):
+        if order is None:
+            order = self.size
+        node = self.root
+        for ch in self.key(act):
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _Node()
+            node = child
+        node.actions.append((order, act))
+        self.size += 1
+
+    def match(self, comment):
+        node = self.root
+        found = list(node.actions)
+        longest = node.actions
+        for ch in comment:
+            node = node.children.get(ch)
+            if node is None:
+                break
+            if node.actions:
+                found.extend(node.actions)
+                longest = node.actions
+
+        if self.mode == MATCH_LONGEST:
+            return [act for _, act in longest]
+
+        if len(found) > 1:
+            found.sort(key=lambda entry: entry[0])
+        return [act for _, act in found]
+
+
+PREFIX = "prefix"
+PATTERN = "pattern"
+REGEX = "regex"
+TRIGGER_TYPES = (PREFIX, PATTERN, REGEX)
+
+ARGUMENT = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)(?::([a-z]+))?\}")
+NAMED_GROUP = re.compile(r"\(\?P([<=])([A-Za-z_][A-Za-z0-9_]*)")
+ARGUMENT_TYPES = {
+    "word": (r"\S+", str),
+    "int": (r"[+-]?\d+", int),
+    "hex": (r"[0-9A-Fa-f]+", str),
+    "rest": (r".+", str),
+}
+
+
+def _literal(text):
+    return r"\s+".join(re.escape(part) for part in text.split(" "))
+
+
+def compile_pattern(trigger, trigger_type=PATTERN):
+    if trigger_type == REGEX:
+        # compiled inside a group the way PatternIndex will, which rejects global flags mid-pattern
+        expression = re.compile(f"(?:{trigger})")
+        return trigger, {name: str for name in expression.groupindex}, ""
+
+    parts = []
+    converters = {}
+    pos = 0
+    for match in ARGUMENT.finditer(trigger):
+        name, kind = match.group(1), match.group(2) or "word"
+        if kind not in ARGUMENT_TYPES:
+            raise ValueError(f"unknown argument type {kind!r} in {match.group(0)}")
+        if name in converters:
+            raise ValueError(f"argument {name!r} is used twice")
+        parts.append(_literal(trigger[pos:match.start()]))
+        expression, converters[name] = ARGUMENT_TYPES[kind]
+        parts.append(f"(?P<{name}>{expression})")
+        pos = match.end()
+    parts.append(_literal(trigger[pos:]))
+    first = ARGUMENT.search(trigger)
+    prefix = (trigger[:first.start()] if first else trigger).rstrip()
+    # like a prefix trigger, the pattern must end on a word boundary but may be followed by more text
+    return "".join(parts) + r"(?=\s|$)", converters, prefix
+
+
+class PatternIndex:
+    def __init__(self, actions, key, prefix=None):
+        branches = []
+        self.branches = {}
+        leads = set()
+        for n, act in enumerate(actions):
+            source, converters = key(act)
+            lead = prefix(act)[:1] if prefix else ""
+            if lead.isspace():
+                lead = ""
+            leads.add(lead)
+            # group names are made unique per branch so every pattern fits in one alternation
+            source = NAMED_GROUP.sub(lambda match: f"(?P{match.group(1)}a{n}_{match.group(2)}", source)
+            branches.append(f"(?P<t{n}>{source})")
+            self.branches[f"t{n}"] = (act, [(f"a{n}_{name}", name, convert) for name, convert in converters.items()])
+        self.expression = re.compile("|".join(branches), re.DOTALL)
+        # re tries every branch in turn, so plain chatter is turned away on its first character instead
+        self.leads = None if "" in leads else frozenset(leads)
+
+    def match(self, comment):
+        if self.leads is not None and comment[:1] not in self.leads:
+            return None
+        match = self.expression.match(comment)
+        if match is None:
+            return None
+        # the branch group closes after its arguments, so it is always the last group matched
+        act, arguments = self.branches[match.lastgroup]
+        args = {}
+        for group, name, convert in arguments:
+            value = match.group(group)
+            if value is not None:
+                args[name] = convert(value)
+        return act, args, match.end()